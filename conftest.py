@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sync_thumbnails(settings):
+    # Миниатюры строятся сразу после коммита, а не в пуле потоков: иначе
+    # поток пишет варианты в MEDIA_ROOT теста, который уже удаляется.
+    settings.THUMBNAIL_EXECUTOR = "sync"
@@ -0,0 +1,68 @@
+"""Условные GET для API: 304 раньше, чем выполнен запрос страницы.
+
+``Last-Modified`` — самый новый ``pub_date`` выборки или время выдачи
+токенов поколений, от которых зависит ответ (см. ``invalidation``), если
+оно позже. ETag строится из него, адреса запроса, пользователя и этих
+токенов, поэтому он меняется вместе с телом ответа и может быть сильным.
+"""
+import hashlib
+import math
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from posts import invalidation
+
+
+class ConditionalGetMixin:
+    # Поле с датой, по которой считается Last-Modified; None — без неё.
+    modified_field = "pub_date"
+
+    def get_generations(self):
+        return []
+
+    def get_validators(self, queryset):
+        tokens, modified = invalidation.page_state(self.get_generations())
+        if self.modified_field:
+            newest = queryset.aggregate(newest=Max(self.modified_field))
+            if newest["newest"]:
+                modified = max(modified, newest["newest"].timestamp())
+        parts = [
+            self.request.get_full_path(),
+            str(self.request.user.pk),
+            *tokens,
+            repr(modified),
+        ]
+        etag = hashlib.md5("\x1f".join(parts).encode()).hexdigest()
+        return f'"{etag}"', math.ceil(modified)
+
+    def conditional(self, queryset, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(queryset)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.filter_queryset(self.get_queryset()),
+            super().list,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup]}
+        )
+        return self.conditional(
+            queryset, super().retrieve, request, *args, **kwargs
+        )
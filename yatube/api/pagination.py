@@ -0,0 +1,42 @@
+from django.conf import settings
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from posts.paginators import CursorPaginator
+
+
+class KeysetPagination(BasePagination):
+    """Страницы по (pub_date, id) тем же паджинатором, что и у HTML-лент."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = CursorPaginator(
+            queryset, settings.POSTS_PER_PAGE
+        ).get_page(
+            after=request.query_params.get("after"),
+            before=request.query_params.get("before"),
+        )
+        return list(self.page)
+
+    def get_link(self, param, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        for name in ("after", "before"):
+            url = remove_query_param(url, name)
+        return replace_query_param(url, param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_link("after", self.page.next_cursor),
+            "previous": self.get_link("before", self.page.previous_cursor),
+            "results": data,
+        })
+
+
+class IdCursorPagination(CursorPagination):
+    """Курсор по id для моделей без даты публикации."""
+
+    ordering = "-pk"
+    page_size = 100
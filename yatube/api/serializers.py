@@ -0,0 +1,70 @@
+from rest_framework import serializers
+
+from posts.models import Comment, Follow, Group, Post
+
+
+def requested_fields(request):
+    """Поля из ``?fields=id,text`` или None, если нужны все."""
+    fields = request and request.query_params.get("fields")
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(",")}
+
+
+class SparseFieldsMixin:
+    """Оставляет в ответе только поля, перечисленные в ``?fields=``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get("request"))
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class GroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ("id", "title", "slug", "description")
+
+
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field="username", read_only=True
+    )
+    group = serializers.SlugRelatedField(slug_field="slug", read_only=True)
+
+    class Meta:
+        model = Post
+        fields = (
+            "id",
+            "text",
+            "pub_date",
+            "author",
+            "group",
+            "image",
+            "comments_count",
+        )
+
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field="username", read_only=True
+    )
+
+    class Meta:
+        model = Comment
+        fields = ("id", "post", "author", "text", "pub_date")
+
+
+class FollowSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user = serializers.SlugRelatedField(
+        slug_field="username", read_only=True
+    )
+    author = serializers.SlugRelatedField(
+        slug_field="username", read_only=True
+    )
+
+    class Meta:
+        model = Follow
+        fields = ("id", "user", "author")
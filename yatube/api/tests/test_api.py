@@ -0,0 +1,167 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import commit_callbacks
+
+
+@override_settings(POSTS_PER_PAGE=2)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader")
+        cls.author = User.objects.create_user("author")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f"Пост {number}", author=cls.author, group=cls.group
+            )
+            for number in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text="Комментарий"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.reader = APIClient()
+        self.reader.force_authenticate(self.user)
+
+    def test_posts_cursor_pagination(self):
+        """Список постов отдаётся страницами по курсору."""
+        response = self.client.get(reverse("api:posts-list"))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [post["id"] for post in data["results"]],
+            [self.posts[2].pk, self.posts[1].pk],
+        )
+        self.assertIsNone(data["previous"])
+        data = self.client.get(data["next"]).json()
+        self.assertEqual(
+            [post["id"] for post in data["results"]], [self.posts[0].pk]
+        )
+        self.assertIsNone(data["next"])
+        self.assertIsNotNone(data["previous"])
+
+    def test_post_fields(self):
+        """Автор и группа отдаются идентификаторами из адресов сайта."""
+        response = self.client.get(
+            reverse("api:posts-detail", args=[self.posts[0].pk])
+        )
+        data = response.json()
+        self.assertEqual(data["author"], "author")
+        self.assertEqual(data["group"], "group")
+        self.assertEqual(data["comments_count"], 1)
+
+    def test_sparse_fieldsets(self):
+        """?fields= сужает ответ и лишние JOIN."""
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse("api:posts-list"), {"fields": "id,text"}
+            )
+        self.assertEqual(
+            set(response.json()["results"][0]), {"id", "text"}
+        )
+
+    def test_list_queries(self):
+        """Автор и группа приходят одним запросом со страницей."""
+        with self.assertNumQueries(2):
+            self.client.get(reverse("api:posts-list"))
+
+    def test_filters(self):
+        """Посты фильтруются по группе и автору."""
+        response = self.client.get(
+            reverse("api:posts-list"), {"author": "reader"}
+        )
+        self.assertEqual(response.json()["results"], [])
+        response = self.client.get(
+            reverse("api:posts-list"), {"group": "group"}
+        )
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_groups_and_comments(self):
+        """Группы доступны по slug, комментарии — по посту."""
+        response = self.client.get(
+            reverse("api:groups-detail", args=["group"])
+        )
+        self.assertEqual(response.json()["title"], "Группа")
+        response = self.client.get(
+            reverse("api:comments-list", args=[self.posts[0].pk])
+        )
+        self.assertEqual(
+            response.json()["results"][0]["text"], "Комментарий"
+        )
+        response = self.client.get(reverse("api:comments-list", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_follows_and_feed(self):
+        """Подписки и лента доступны только их владельцу."""
+        self.assertIn(
+            self.client.get(reverse("api:feed-list")).status_code,
+            (401, 403),
+        )
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.reader.get(reverse("api:follows-list"))
+        self.assertEqual(response.json()["results"][0]["author"], "author")
+        response = self.reader.get(reverse("api:feed-list"))
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_etag_not_modified(self):
+        """Повторный запрос с If-None-Match получает 304 без страницы."""
+        url = reverse("api:posts-list")
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_last_modified(self):
+        """If-Modified-Since даёт 304, пока ничего не менялось."""
+        url = reverse("api:posts-list")
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes(self):
+        """Новый пост, правка и комментарий меняют ETag."""
+        url = reverse("api:posts-list")
+        etags = [self.client.get(url)["ETag"]]
+        with commit_callbacks():
+            Post.objects.create(text="Новый", author=self.author)
+        etags.append(self.client.get(url)["ETag"])
+        post = self.posts[2]
+        post.text = "Правка"
+        with commit_callbacks():
+            post.save()
+        etags.append(self.client.get(url)["ETag"])
+        with commit_callbacks():
+            Comment.objects.create(post=post, author=self.user, text="Ещё")
+        etags.append(self.client.get(url)["ETag"])
+        self.assertEqual(len(set(etags)), 4)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 200)
+
+    def test_comment_keeps_groups_etag(self):
+        """Комментарий меняет ETag своего поста, но не списка групп."""
+        post = self.posts[0]
+        urls = [
+            reverse("api:groups-list"),
+            reverse("api:comments-list", args=[post.pk]),
+            reverse("api:posts-detail", args=[post.pk]),
+        ]
+        etags = [self.client.get(url)["ETag"] for url in urls]
+        with commit_callbacks():
+            Comment.objects.create(post=post, author=self.user, text="Ещё")
+        statuses = [
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+            for url, etag in zip(urls, etags)
+        ]
+        self.assertEqual(statuses, [304, 200, 200])
@@ -0,0 +1,101 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import mixins, viewsets
+from rest_framework.permissions import IsAuthenticated
+
+from posts import feed, invalidation
+from posts.models import Follow, Group, Post
+
+from .conditional import ConditionalGetMixin
+from .pagination import IdCursorPagination, KeysetPagination
+from .serializers import (CommentSerializer, FollowSerializer,
+                          GroupSerializer, PostSerializer, requested_fields)
+
+
+def _select_posts(posts, request):
+    """select_related только для связей, которые попадут в ответ."""
+    fields = requested_fields(request)
+    related = [
+        name for name in ("author", "group")
+        if fields is None or name in fields
+    ]
+    return posts.select_related(*related) if related else posts
+
+
+class PostViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = PostSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        posts = Post.objects.all()
+        group = self.request.query_params.get("group")
+        if group:
+            posts = posts.filter(group__slug=group)
+        author = self.request.query_params.get("author")
+        if author:
+            posts = posts.filter(author__username=author)
+        return _select_posts(posts, self.request)
+
+    def get_generations(self):
+        if self.action == "retrieve":
+            return invalidation.post_generations(self.kwargs["pk"])
+        return invalidation.index_generations()
+
+
+class GroupViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Group.objects.order_by("title")
+    serializer_class = GroupSerializer
+    lookup_field = "slug"
+    modified_field = None
+    pagination_class = None
+
+    def get_generations(self):
+        return [invalidation.GROUPS_GENERATION]
+
+
+class CommentViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = CommentSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        post = get_object_or_404(Post, pk=self.kwargs["post_id"])
+        comments = post.comments.all()
+        fields = requested_fields(self.request)
+        if fields is None or "author" in fields:
+            comments = comments.select_related("author")
+        return comments
+
+    def get_generations(self):
+        return invalidation.post_generations(self.kwargs["post_id"])
+
+
+class FollowViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Подписки текущего пользователя."""
+
+    serializer_class = FollowSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = IdCursorPagination
+    modified_field = None
+
+    def get_queryset(self):
+        return Follow.objects.filter(user=self.request.user).select_related(
+            "user", "author"
+        )
+
+    def get_generations(self):
+        return [invalidation.follow_generation(self.request.user.pk)]
+
+
+class FeedViewSet(
+    ConditionalGetMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+):
+    """Лента подписок текущего пользователя."""
+
+    serializer_class = PostSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return _select_posts(feed.get_feed(self.request.user), self.request)
+
+    def get_generations(self):
+        return invalidation.follow_generations(self.request.user.pk)
@@ -0,0 +1,264 @@
+"""Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+Локальная замена Redis/Memcached для разработки и тестов: воркеры
+gunicorn видят одни и те же ключи, а размер ограничен числом записей
+(``MAX_ENTRIES``) и байтами (``MAX_BYTES``) с вытеснением давно не
+читанных записей (LRU).
+"""
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+
+class CacheStats:
+    """Счётчики попаданий, промахов и вытеснений в пределах процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, namespace, hits=0, misses=0, evictions=0):
+        with self._lock:
+            self._counts[namespace, "hits"] += hits
+            self._counts[namespace, "misses"] += misses
+            self._counts[namespace, "evictions"] += evictions
+        request = metrics.current()
+        if request is not None:
+            request.cache_hits += hits
+            request.cache_misses += misses
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        result = {}
+        for (namespace, name), value in counts.items():
+            result.setdefault(namespace, {})[name] = value
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+"""
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        options = params.get("OPTIONS", {})
+        self.max_bytes = int(options.get("MAX_BYTES", 64 * 1024 * 1024))
+        self.busy_timeout = float(options.get("BUSY_TIMEOUT", 5))
+        # Время чтения обновляется не чаще раза в TOUCH_INTERVAL секунд:
+        # иначе каждое попадание брало бы блокировку записи SQLite.
+        self.touch_interval = float(options.get("TOUCH_INTERVAL", 60))
+        self.cull_every = int(options.get("CULL_EVERY", 50))
+        self._writes = 0
+        self.namespace = options.get("STATS_NAMESPACE", "cache")
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(
+                self.location,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._local.db = db
+        return db
+
+    def _touch_rows(self, keys, now):
+        self._db.executemany(
+            "UPDATE cache SET accessed = ? WHERE key = ?",
+            [(now, key) for key in keys],
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        found = self._get_rows([key])
+        if key not in found:
+            return default
+        return found[key]
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        found = self._get_rows(list(made))
+        return {made[key]: value for key, value in found.items()}
+
+    def _get_rows(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        rows = self._db.execute(
+            f"SELECT key, value, expires, accessed FROM cache "
+            f"WHERE key IN ({placeholders})",
+            keys,
+        ).fetchall()
+        found = {}
+        expired = []
+        stale = []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                expired.append(key)
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed >= self.touch_interval:
+                stale.append(key)
+        if expired:
+            self._delete_rows(expired)
+        if stale:
+            self._touch_rows(stale, now)
+        stats.record(
+            self.namespace, hits=len(found), misses=len(keys) - len(found)
+        )
+        return found
+
+    def _write(self, key, value, timeout, replace=True):
+        self.validate_key(key)
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        db = self._db
+        if not replace:
+            db.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now)
+            )
+        cursor = db.execute(
+            f"{verb} INTO cache (key, value, size, expires, accessed) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, blob, len(blob), self.get_backend_timeout(timeout), now),
+        )
+        return cursor.rowcount > 0
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(self.make_key(key, version=version), value, timeout)
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for key, value in data.items():
+                key = self.make_key(key, version=version)
+                self._write(key, value, timeout)
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        self._maybe_cull(len(data))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._write(
+            self.make_key(key, version=version), value, timeout, replace=False
+        )
+        self._maybe_cull()
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._db.execute(
+            "UPDATE cache SET expires = ? WHERE key = ?",
+            (self.get_backend_timeout(timeout), key),
+        )
+        return cursor.rowcount > 0
+
+    def _delete_rows(self, keys):
+        placeholders = ",".join("?" * len(keys))
+        cursor = self._db.execute(
+            f"DELETE FROM cache WHERE key IN ({placeholders})", keys
+        )
+        return cursor.rowcount
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._delete_rows([key])
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        if keys:
+            self._delete_rows(keys)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        row = self._db.execute(
+            "SELECT 1 FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._db.execute("DELETE FROM cache")
+
+    def _maybe_cull(self, written=1):
+        # Как _cull_frequency у Django: полный проход по таблице раз в
+        # CULL_EVERY записей, а не на каждой.
+        self._writes += written
+        if self._writes >= self.cull_every:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        db = self._db
+        db.execute(
+            "DELETE FROM cache WHERE expires <= ?", (time.time(),)
+        )
+        count, size = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+        excess = max(count - self._max_entries, 0)
+        if size > self.max_bytes:
+            # Сколько самых старых записей освобождают лишние байты.
+            freed = 0
+            for number, (row_size,) in enumerate(db.execute(
+                "SELECT size FROM cache ORDER BY accessed"
+            ), 1):
+                freed += row_size
+                if size - freed <= self.max_bytes:
+                    break
+            excess = max(excess, number)
+        if not excess:
+            return
+        evicted = db.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+            "ORDER BY accessed LIMIT ?)",
+            (excess,),
+        ).rowcount
+        stats.record(self.namespace, evictions=evicted)
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время потока: открывать файл на каждый
+        # запрос дороже, чем держать его.
+        pass
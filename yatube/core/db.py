@@ -0,0 +1,27 @@
+"""Настройка соединений с базой сразу после открытия."""
+from django.conf import settings
+from django.db import connections, router
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def bulk_batch_size(model, limit):
+    """Пачка ``bulk_create`` не больше ``limit`` и предела базы.
+
+    Django 2.2 не урезает явный ``batch_size`` до предела бэкенда, и
+    SQLite падает на пачках больше 500 строк («too many terms in
+    compound SELECT»); с Django 3.0 это делает сам ``bulk_create``.
+    """
+    connection = connections[router.db_for_write(model)]
+    return connection.ops.bulk_batch_size(
+        model._meta.concrete_fields, range(limit)
+    ) or limit
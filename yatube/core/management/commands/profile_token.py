@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Выдаёт подписанное значение заголовка X-Profile: запрос с ним "
+        "профилируется и сохраняется в PROFILING_DIR."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiler",
+            choices=profiling.PROFILERS,
+            default=settings.PROFILING_PROFILER,
+            help="cprofile или sampling (по умолчанию PROFILING_PROFILER).",
+        )
+
+    def handle(self, *args, **options):
+        token = profiling.make_token(options["profiler"])
+        minutes = settings.PROFILING_TOKEN_MAX_AGE // 60
+        self.stderr.write(f"Токен действует {minutes} мин. Например:")
+        self.stderr.write(f'curl -H "X-Profile: {token}" <адрес>')
+        self.stdout.write(token)
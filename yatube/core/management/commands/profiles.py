@@ -0,0 +1,54 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Сохранённые профили запросов по адресам: сколько времени ушло "
+        "на ORM, шаблоны, миниатюры и остальной Python."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--view", help="Только профили адреса, например posts:index."
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=5,
+            help="Последних профилей на адрес (по умолчанию 5).",
+        )
+
+    def handle(self, *args, **options):
+        root = settings.PROFILING_DIR
+        if not os.path.isdir(root):
+            raise CommandError(f"Профилей ещё нет: {root} не существует.")
+        views = sorted(os.listdir(root))
+        if options["view"]:
+            views = [
+                view for view in views
+                if view == options["view"].replace(":", ".")
+            ]
+        for view in views:
+            directory = os.path.join(root, view)
+            names = sorted(
+                os.listdir(directory),
+                key=lambda name: os.path.getmtime(
+                    os.path.join(directory, name)
+                ),
+                reverse=True,
+            )[:options["limit"]]
+            self.stdout.write(view.replace(".", ":"))
+            for name in names:
+                shares = profiling.breakdown(
+                    profiling.read_profile(os.path.join(directory, name))
+                )
+                parts = ", ".join(
+                    f"{category} {share:.0%}"
+                    for category, share in shares.items()
+                )
+                self.stdout.write(f"  {name}: {parts or 'нет сэмплов'}")
@@ -0,0 +1,51 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy(source_name, target_name):
+    source = sqlite3.connect(source_name)
+    target = sqlite3.connect(target_name)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Замена репликации для локальной проверки DB_REPLICAS: копирует "
+        "основную базу SQLite в файлы реплик один раз или по кругу."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Копировать каждые N секунд, пока не прервут; "
+            "по умолчанию один раз.",
+        )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("Команда копирует только базы SQLite.")
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("Реплики не настроены: задайте DB_REPLICAS.")
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                copy(
+                    primary.settings_dict["NAME"],
+                    connections[alias].settings_dict["NAME"],
+                )
+            self.stdout.write(
+                f"Скопировано в реплик: {len(settings.DATABASE_REPLICAS)}"
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Самые дорогие SQL-запросы по отпечаткам из статистики QUERY_STATS: "
+        "сколько раз выполнялись, сколько времени заняли и в каких "
+        "представлениях."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10,
+            help="Сколько отпечатков показать (по умолчанию 10).",
+        )
+        parser.add_argument(
+            "--order",
+            choices=("total", "count", "avg", "max"),
+            default="total",
+            help="Сортировка: общее время, число, среднее или худшее "
+            "время (по умолчанию total).",
+        )
+        parser.add_argument(
+            "--view", help="Только запросы представления, например "
+            "posts:follow_index.",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Вывести JSON вместо таблицы."
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Очистить статистику после вывода.",
+        )
+
+    def handle(self, *args, **options):
+        rows = queries.stats.top(
+            options["limit"], options["order"], options["view"]
+        )
+        if options["json"]:
+            self.stdout.write(json.dumps(rows, ensure_ascii=False, indent=2))
+        elif not rows:
+            self.stdout.write(
+                "Статистики нет: включите QUERY_STATS=1 и дайте сайту "
+                "поработать."
+            )
+        else:
+            self.write_table(rows)
+        if options["reset"]:
+            queries.stats.reset()
+
+    def write_table(self, rows):
+        for number, row in enumerate(rows, 1):
+            self.stdout.write(
+                f"{number}. {row['id']}  всего {row['total'] * 1000:.1f} мс, "
+                f"{row['count']} раз, в среднем {row['avg'] * 1000:.2f} мс, "
+                f"худший {row['max'] * 1000:.1f} мс\n"
+                f"   {', '.join(row['views'])}\n"
+                f"   {row['fingerprint']}"
+            )
@@ -0,0 +1,201 @@
+"""Метрики запросов в памяти процесса и их вывод для Prometheus.
+
+``MetricsMiddleware`` собирает на каждый запрос ``RequestMetrics``:
+время SQL, шаблонов и обращения к кэшу, а в конце складывает их в
+гистограммы ``registry`` по имени адреса (``posts:index``). У каждого
+воркера gunicorn свои гистограммы: Prometheus суммирует их сам, если
+каждый воркер слушает свой порт.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from . import queries
+
+_current = ContextVar("request_metrics", default=None)
+
+HISTOGRAMS = {
+    "yatube_request_duration_seconds": (
+        "Время обработки запроса", "METRICS_DURATION_BUCKETS", "duration",
+    ),
+    "yatube_db_queries": (
+        "SQL-запросов на запрос", "METRICS_QUERY_BUCKETS", "queries",
+    ),
+    "yatube_db_duration_seconds": (
+        "Время SQL на запрос", "METRICS_DURATION_BUCKETS", "db_time",
+    ),
+    "yatube_template_duration_seconds": (
+        "Время отрисовки шаблонов на запрос", "METRICS_DURATION_BUCKETS",
+        "template_time",
+    ),
+}
+
+
+class RequestMetrics:
+    """Что потратил один запрос; доступен через ``current()``."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка connection.execute_wrapper: считает каждый запрос к базе.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            queries.record(self.view, sql, duration)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Значение заголовка ``Server-Timing``, длительности в мс."""
+        return ", ".join((
+            f"total;dur={self.duration * 1000:.1f}",
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} SQL"',
+            f"tpl;dur={self.template_time * 1000:.1f}",
+            f'cache;desc="{self.cache_hits} hit, {self.cache_misses} miss"',
+        ))
+
+
+def current():
+    return _current.get()
+
+
+def start():
+    """Начинает сбор для текущего запроса; вернёт токен для ``stop``."""
+    return _current.set(RequestMetrics())
+
+
+def stop(token):
+    _current.reset(token)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def _escape(value):
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _labels(**labels):
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Гистограммы и счётчики по имени адреса в пределах процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._responses = Counter()
+        self._cache = Counter()
+
+    def observe(self, view, status, metrics):
+        with self._lock:
+            for name, (_, buckets, attribute) in HISTOGRAMS.items():
+                histogram = self._histograms.get((name, view))
+                if histogram is None:
+                    histogram = self._histograms[name, view] = Histogram(
+                        getattr(settings, buckets)
+                    )
+                histogram.observe(getattr(metrics, attribute))
+            self._responses[view, status] += 1
+            self._cache[view, "hit"] += metrics.cache_hits
+            self._cache[view, "miss"] += metrics.cache_misses
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._responses.clear()
+            self._cache.clear()
+
+    def render(self, cache_stats=None):
+        """Текстовый формат Prometheus 0.0.4.
+
+        ``cache_stats`` — снимок ``core.cache.stats`` по пространствам.
+        """
+        with self._lock:
+            histograms = {
+                key: (histogram.buckets, list(histogram.counts),
+                      histogram.sum)
+                for key, histogram in self._histograms.items()
+            }
+            responses = dict(self._responses)
+            cache = dict(self._cache)
+        lines = []
+        for name, (help_text, _, _) in HISTOGRAMS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (metric, view), (buckets, counts, total) in sorted(
+                histograms.items()
+            ):
+                if metric != name:
+                    continue
+                seen = 0
+                for bound, count in zip(buckets + ("+Inf",), counts):
+                    seen += count
+                    labels = _labels(view=view, le=_number(bound))
+                    lines.append(f"{name}_bucket{labels} {seen}")
+                lines.append(f"{name}_sum{_labels(view=view)} {total!r}")
+                lines.append(f"{name}_count{_labels(view=view)} {seen}")
+        lines += [
+            "# HELP yatube_responses_total Ответы по адресам и статусам",
+            "# TYPE yatube_responses_total counter",
+        ]
+        for (view, status), count in sorted(responses.items()):
+            labels = _labels(view=view, status=status)
+            lines.append(f"yatube_responses_total{labels} {count}")
+        lines += [
+            "# HELP yatube_request_cache_total Обращения к кэшу по адресам",
+            "# TYPE yatube_request_cache_total counter",
+        ]
+        for (view, result), count in sorted(cache.items()):
+            labels = _labels(view=view, result=result)
+            lines.append(f"yatube_request_cache_total{labels} {count}")
+        if cache_stats is not None:
+            lines += [
+                "# HELP yatube_cache_events_total Попадания, промахи и "
+                "вытеснения кэша",
+                "# TYPE yatube_cache_events_total counter",
+            ]
+            for namespace, events in sorted(cache_stats.items()):
+                for event, count in sorted(events.items()):
+                    labels = _labels(namespace=namespace, event=event)
+                    lines.append(f"yatube_cache_events_total{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
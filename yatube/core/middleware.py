@@ -0,0 +1,131 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, profiling, queries
+from .routers import replica_reads
+
+
+class MetricsMiddleware:
+    """Замеряет запрос целиком и складывает метрики по имени адреса.
+
+    Стоит первым, чтобы время включало остальные middleware. При
+    ``METRICS_SERVER_TIMING`` ответ получает заголовок ``Server-Timing``:
+    его показывают инструменты разработчика браузера.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = metrics.start()
+        collected = metrics.current()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(collected)
+                    )
+                response = self.get_response(request)
+            collected.finish()
+        finally:
+            metrics.stop(token)
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        metrics.registry.observe(view, response.status_code, collected)
+        if settings.QUERY_STATS:
+            queries.stats.flush()
+        if settings.METRICS_SERVER_TIMING:
+            response["Server-Timing"] = collected.server_timing()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Запросы из представления подписываются его именем в журнале
+        # медленных запросов и статистике отпечатков.
+        collected = metrics.current()
+        if collected is not None:
+            collected.view = request.resolver_match.view_name
+
+
+class ReplicaMiddleware:
+    """Отправляет чтение GET-запросов на реплики.
+
+    Запрос, который что-то записал, ставит cookie: следующие
+    ``REPLICA_PIN_SECONDS`` секунд пользователь читает основную базу
+    и видит свою запись, даже если реплика ещё не догнала.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replicas = (
+            request.method in ("GET", "HEAD") and not self.pinned(request)
+        )
+        with replica_reads(use_replicas) as state:
+            response = self.get_response(request)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                str(int(time.time() + settings.REPLICA_PIN_SECONDS)),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def pinned(self, request):
+        try:
+            until = int(request.COOKIES[settings.REPLICA_PIN_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        return until > time.time()
+
+
+class ProfilingMiddleware:
+    """Снимает профиль запроса по заголовку, параметру или выборке.
+
+    Стоит после AuthenticationMiddleware: ``?profile`` разрешён только
+    персоналу. Явно запрошенный профиль возвращается заголовком
+    ``X-Profile`` с путём файла, случайная выборка только сохраняется.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler, explicit = profiling.chosen_profiler(request)
+        if profiler is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        response, result = profiling.run(
+            profiler, self.get_response, request
+        )
+        if result is None:
+            return response
+        match = request.resolver_match
+        path = profiling.store(
+            match.view_name if match else "unresolved",
+            profiler,
+            result,
+            time.perf_counter() - started,
+        )
+        if explicit:
+            response["X-Profile"] = path
+        return response
+
+
+def show_toolbar(request):
+    """``SHOW_TOOLBAR_CALLBACK`` для debug_toolbar: только GET и HEAD.
+
+    Панель SQL не умеет ``executemany`` на SQLite, а на нём держится
+    запись в поисковый индекс. После POST всё равно идёт редирект, и
+    панель на нём не видна.
+    """
+    return (
+        request.method in ("GET", "HEAD")
+        and settings.DEBUG
+        and request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS
+    )
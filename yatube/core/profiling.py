@@ -0,0 +1,215 @@
+"""Профилирование отдельных запросов.
+
+Запрос профилируется, если у него есть подписанный заголовок
+``X-Profile`` (команда ``profile_token``), если сотрудник добавил
+``?profile=1`` к адресу или если он попал в случайную выборку
+``PROFILING_SAMPLE_RATE``. Результат сохраняется в
+``PROFILING_DIR/<имя адреса>/``:
+
+* ``cprofile`` — файл ``.prof`` для ``pstats``, snakeviz или flameprof;
+* ``sampling`` — свёрнутые стеки ``.folded`` (строка «стек число»)
+  для flamegraph.pl и speedscope. Поток-сэмплер раз в
+  ``PROFILING_INTERVAL`` секунд снимает стек потока запроса, поэтому
+  накладные расходы почти не зависят от глубины кода.
+
+Команда ``profiles`` показывает, сколько времени ушло на ORM, шаблоны
+и миниатюры.
+"""
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+PROFILERS = ("cprofile", "sampling")
+EXTENSIONS = {"cprofile": "prof", "sampling": "folded"}
+SALT = "core.profiling"
+
+# cProfile в Python 3.12+ глобальный для процесса: два профиля сразу
+# не снять, второй запрос просто выполняется без профайлера.
+_cprofile_lock = threading.Lock()
+
+# Сэмпл относится к категории самого глубокого кадра, который в неё
+# попадает: SQL из шаблона считается временем ORM, а не шаблона.
+# Для cProfile это ещё и встроенные функции драйверов и Pillow.
+CATEGORIES = (
+    ("orm", ("django/db/", "sqlite3.Cursor", "psycopg2")),
+    ("thumbnails", ("sorl/", "PIL/", "Imaging", "posts/thumbnails.py")),
+    ("templates", ("django/template/", "/templatetags/")),
+)
+
+
+def make_token(profiler):
+    return signing.TimestampSigner(salt=SALT).sign(profiler)
+
+
+def read_token(token):
+    """Профайлер из заголовка ``X-Profile``; ``None`` — подпись плохая."""
+    try:
+        profiler = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    return profiler if profiler in PROFILERS else None
+
+
+def _short_path(filename):
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.relpath(filename, settings.BASE_DIR)
+
+
+class Sampler:
+    """Снимает стек одного потока в фоне и считает одинаковые стеки."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.counts = Counter()
+        self._thread_id = threading.get_ident()
+        self._root = None
+        self._stopped = threading.Event()
+        self._labels = {}
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = (
+                f"{code.co_name} "
+                f"({_short_path(code.co_filename)}:{code.co_firstlineno})"
+            )
+        return label
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._thread_id)
+        stack = []
+        # Кадры выше middleware — сервер и обработчик Django, они
+        # одинаковы у всех запросов.
+        while frame is not None and frame is not self._root:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if stack:
+            self.counts[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def runcall(self, function, *args):
+        self._root = sys._getframe()
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        try:
+            return function(*args)
+        finally:
+            self._stopped.set()
+            thread.join()
+
+    def dump(self, path):
+        with open(path, "w") as file:
+            for stack, count in sorted(self.counts.items()):
+                file.write(f"{stack} {count}\n")
+
+
+def category(stack):
+    for frame in reversed(stack.split(";")):
+        for name, markers in CATEGORIES:
+            if any(marker in frame for marker in markers):
+                return name
+    return "python"
+
+
+def breakdown(counts):
+    """Доли категорий по весам стеков: ``{"orm": 0.4, ...}``."""
+    total = sum(counts.values())
+    if not total:
+        return {}
+    shares = Counter()
+    for stack, count in counts.items():
+        shares[category(stack)] += count / total
+    return dict(shares.most_common())
+
+
+def read_profile(path):
+    """Веса стеков из сохранённого профиля.
+
+    Для ``.prof`` стек — одна функция, вес — её собственное время.
+    """
+    counts = Counter()
+    if path.endswith(".prof"):
+        for (filename, line, name), row in pstats.Stats(path).stats.items():
+            counts[f"{name} ({filename}:{line})"] += row[2]
+        return counts
+    with open(path) as file:
+        for line in file:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            counts[stack] += int(count)
+    return counts
+
+
+def chosen_profiler(request):
+    """Профайлер для запроса (``None`` — не нужен) и запрошен ли он явно."""
+    token = request.META.get("HTTP_X_PROFILE")
+    if token:
+        profiler = read_token(token)
+        if profiler is not None:
+            return profiler, True
+    value = request.GET.get("profile")
+    if value and request.user.is_active and request.user.is_staff:
+        if value in PROFILERS:
+            return value, True
+        return settings.PROFILING_PROFILER, True
+    rate = settings.PROFILING_SAMPLE_RATE
+    if rate and random.random() < rate:
+        return "sampling", False
+    return None, False
+
+
+def run(profiler, function, *args):
+    """Выполняет ``function`` под профайлером; вернёт результат и профиль.
+
+    Профиль ``None``, если cProfile уже занят другим запросом.
+    """
+    if profiler == "cprofile":
+        if not _cprofile_lock.acquire(blocking=False):
+            return function(*args), None
+        try:
+            profile = cProfile.Profile()
+            return profile.runcall(function, *args), profile
+        finally:
+            _cprofile_lock.release()
+    sampler = Sampler(settings.PROFILING_INTERVAL)
+    return sampler.runcall(function, *args), sampler
+
+
+def store(view, profiler, result, duration):
+    """Сохраняет профиль, оставляя ``PROFILING_KEEP`` последних на адрес.
+
+    Возвращает путь относительно ``PROFILING_DIR``.
+    """
+    directory = os.path.join(settings.PROFILING_DIR, view.replace(":", "."))
+    os.makedirs(directory, exist_ok=True)
+    name = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{duration * 1000:.0f}ms-"
+        f"{uuid.uuid4().hex[:6]}.{EXTENSIONS[profiler]}"
+    )
+    path = os.path.join(directory, name)
+    if profiler == "cprofile":
+        result.dump_stats(path)
+    else:
+        result.dump(path)
+    stored = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in stored[:-settings.PROFILING_KEEP]:
+        os.remove(entry.path)
+    return os.path.relpath(path, settings.PROFILING_DIR)
@@ -0,0 +1,201 @@
+"""Отпечатки SQL-запросов, журнал медленных запросов и их статистика.
+
+Отпечаток — текст запроса без значений: строки и числа заменены на
+``?``, списки в ``IN (...)`` и ``VALUES`` свёрнуты. Запросы, которые
+отличаются только параметрами, попадают в одну строку статистики.
+
+Статистика копится в памяти процесса и раз в
+``QUERY_STATS_FLUSH_SECONDS`` дописывается в файл SQLite
+``QUERY_STATS_LOCATION``, общий для всех воркеров: его читает команда
+``top_queries``. Пока ``QUERY_STATS`` и ``SLOW_QUERY_MS`` выключены,
+запрос к базе стоит одного сравнения сверх счётчиков ``core.metrics``.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import traceback
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?(?![\w\"])")
+PLACEHOLDER_RE = re.compile(r"%s|%\(\w+\)s|\?")
+LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+ROWS_RE = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+SPACE_RE = re.compile(r"\s+")
+
+# Кадры стека из этих файлов — обвязка, а не источник запроса.
+INTERNAL_FILES = (__file__,) + tuple(
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ("metrics.py", "middleware.py", "template_backends.py")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_stats (
+    view TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (view, fingerprint)
+);
+"""
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Текст запроса без значений, одинаковый для разных параметров."""
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    sql = PLACEHOLDER_RE.sub("?", sql)
+    sql = LIST_RE.sub("(...)", sql)
+    sql = ROWS_RE.sub("(...)", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint_id(text):
+    return hashlib.md5(text.encode()).hexdigest()[:12]
+
+
+def origin():
+    """Ближайший к запросу кадр стека из кода проекта, а не Django."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (
+            filename.startswith(base_dir)
+            and "site-packages" not in filename
+            and filename not in INTERNAL_FILES
+        ):
+            return frame
+    return None
+
+
+def record(view, sql, duration):
+    """Вызывается обёрткой ``core.metrics`` после каждого запроса."""
+    threshold = settings.SLOW_QUERY_MS
+    if threshold and duration * 1000 >= threshold:
+        frame = origin()
+        logger.warning(
+            "Медленный запрос %.1f мс в %s (%s): %s",
+            duration * 1000,
+            view or "-",
+            f"{frame.filename}:{frame.lineno} в {frame.name}"
+            if frame else "стек вне проекта",
+            sql,
+        )
+    if settings.QUERY_STATS:
+        stats.record(view or "-", fingerprint(sql), duration)
+
+
+class QueryStats:
+    """Буфер статистики процесса и общий файл, куда он сбрасывается."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushed = time.monotonic()
+
+    def record(self, view, text, duration):
+        with self._lock:
+            row = self._pending.get((view, text))
+            if row is None:
+                self._pending[view, text] = [1, duration, duration]
+            else:
+                row[0] += 1
+                row[1] += duration
+                row[2] = max(row[2], duration)
+
+    def _connect(self):
+        db = sqlite3.connect(
+            settings.QUERY_STATS_LOCATION, timeout=5, isolation_level=None
+        )
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SCHEMA)
+        return db
+
+    def flush(self, force=False):
+        """Дописывает буфер в файл, если с прошлого раза прошло время."""
+        now = time.monotonic()
+        if not force and now - self._flushed < (
+            settings.QUERY_STATS_FLUSH_SECONDS
+        ):
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = now
+        if not pending:
+            return
+        db = self._connect()
+        try:
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                db.executemany(
+                    "INSERT INTO query_stats VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (view, fingerprint) DO UPDATE SET "
+                    "count = count + excluded.count, "
+                    "total = total + excluded.total, "
+                    "max = MAX(max, excluded.max)",
+                    [
+                        (view, text, count, total, longest)
+                        for (view, text), (count, total, longest)
+                        in pending.items()
+                    ],
+                )
+        finally:
+            db.close()
+
+    def top(self, limit=10, order="total", view=None):
+        """Самые дорогие отпечатки: ``order`` — total, count, max или avg.
+
+        Без ``view`` строки разных адресов одного отпечатка складываются.
+        """
+        self.flush(force=True)
+        columns = {
+            "total": "SUM(total)", "count": "SUM(count)", "max": "MAX(max)",
+            "avg": "SUM(total) / SUM(count)",
+        }
+        where, params = ("WHERE view = ?", [view]) if view else ("", [])
+        db = self._connect()
+        try:
+            rows = db.execute(
+                "SELECT fingerprint, GROUP_CONCAT(view, ', '), "
+                "SUM(count), SUM(total), MAX(max) "
+                f"FROM query_stats {where} "
+                f"GROUP BY fingerprint ORDER BY {columns[order]} DESC "
+                "LIMIT ?",
+                params + [limit],
+            ).fetchall()
+        finally:
+            db.close()
+        return [
+            {
+                "id": fingerprint_id(text),
+                "fingerprint": text,
+                "views": sorted(set(views.split(", "))),
+                "count": count,
+                "total": total,
+                "avg": total / count,
+                "max": longest,
+            }
+            for text, views, count, total, longest in rows
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+        db = self._connect()
+        try:
+            db.execute("DELETE FROM query_stats")
+        finally:
+            db.close()
+
+
+stats = QueryStats()
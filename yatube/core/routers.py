@@ -0,0 +1,59 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики читаются только внутри запросов, которым это разрешила
+``core.middleware.ReplicaMiddleware``. Всё остальное — команды, потоки
+миниатюр, сигналы вне запроса — читает основную базу: реплика может
+отставать.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = ContextVar("replica_state", default=None)
+
+
+class RequestState:
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+@contextmanager
+def replica_reads(use_replicas):
+    """Состояние запроса: можно ли читать с реплик и была ли запись."""
+    state = RequestState(use_replicas)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None
+            or not state.use_replicas
+            or not settings.DATABASE_REPLICAS
+            # Внутри транзакции читаем то, что в ней же записали.
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
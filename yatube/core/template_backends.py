@@ -0,0 +1,30 @@
+"""Шаблоны Django, которые засекают время отрисовки для метрик."""
+import time
+
+from django.template.backends import django as django_backend
+
+from . import metrics
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        collected = metrics.current()
+        # Вложенная отрисовка (render_to_string из шаблона или из
+        # представления во время другой) уже входит во внешнюю.
+        if collected is None or collected.rendering:
+            return super().render(context, request)
+        collected.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            collected.rendering = False
+            collected.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+
+from core.cache import SQLiteCache, stats
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.location = os.path.join(self.tmp_dir, "cache.sqlite3")
+        stats.reset()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {"OPTIONS": options})
+
+    def test_shared_between_instances(self):
+        """Запись одного экземпляра видна другому, как другому процессу."""
+        self.make_cache().set("key", {"value": 1})
+        other = self.make_cache()
+        self.assertEqual(other.get("key"), {"value": 1})
+        self.assertEqual(
+            other.get_many(["key", "nope"]), {"key": {"value": 1}}
+        )
+        other.delete("key")
+        self.assertIsNone(self.make_cache().get("key"))
+
+    def test_expiry_and_add(self):
+        """Просроченная запись не отдаётся, add не перезаписывает живую."""
+        cache = self.make_cache()
+        cache.set("key", "old", timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("key"))
+        self.assertTrue(cache.add("key", "new"))
+        self.assertFalse(cache.add("key", "newer"))
+        self.assertEqual(cache.get("key"), "new")
+
+    def test_lru_eviction_by_entries(self):
+        """При переполнении вытесняется давно не читанная запись."""
+        cache = self.make_cache(
+            MAX_ENTRIES=2, TOUCH_INTERVAL=0, CULL_EVERY=1
+        )
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"a": 1, "c": 3})
+        self.assertEqual(stats.snapshot()["cache"]["evictions"], 1)
+
+    def test_cull_every(self):
+        """Пределы проверяются раз в CULL_EVERY записей, сразу пачкой."""
+        cache = self.make_cache(MAX_ENTRIES=1, CULL_EVERY=3)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(len(cache.get_many(["a", "b"])), 2)
+        cache.set("c", 3)
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"c": 3})
+        self.assertEqual(stats.snapshot()["cache"]["evictions"], 2)
+
+    def test_hits_do_not_write(self):
+        """Попадания не пишут в файл чаще раза в TOUCH_INTERVAL."""
+        cache = self.make_cache()
+        cache.set("key", 1)
+        changes = cache._db.total_changes
+        for _ in range(5):
+            self.assertEqual(cache.get("key"), 1)
+        self.assertEqual(cache._db.total_changes, changes)
+
+    def test_eviction_by_bytes(self):
+        """Объём кэша не превышает MAX_BYTES."""
+        cache = self.make_cache(MAX_BYTES=2048, CULL_EVERY=1)
+        for i in range(5):
+            cache.set(f"key{i}", "x" * 1000)
+        stored = cache.get_many(f"key{i}" for i in range(5))
+        self.assertLessEqual(len(stored), 2)
+        self.assertEqual(cache.get("key4"), "x" * 1000)
+
+
+class CacheStatsViewTests(TestCase):
+    def test_stats_for_staff_only(self):
+        """Счётчики кэша видны только персоналу."""
+        client = Client()
+        response = client.get("/cache-stats/")
+        self.assertEqual(response.status_code, 302)
+        staff = get_user_model().objects.create_user(
+            "admin", "admin@mail.ru", "12345678", is_staff=True
+        )
+        client.force_login(staff)
+        client.get("/")
+        response = client.get("/cache-stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("feed_page", response.json())
@@ -0,0 +1,28 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connections
+from django.test import SimpleTestCase
+
+
+class SQLitePragmasTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_new_connection_uses_wal(self):
+        """Новое соединение SQLite открывается в WAL с busy_timeout."""
+        default = connections["default"]
+        wrapper = type(default)({
+            **default.settings_dict,
+            "NAME": os.path.join(self.directory, "db.sqlite3"),
+        })
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+
+from core.metrics import RequestMetrics, registry
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.client = Client()
+
+    @override_settings(METRICS_SERVER_TIMING=True)
+    def test_server_timing(self):
+        """Ответ сообщает время запроса, SQL, шаблонов и обращения к кэшу."""
+        response = self.client.get("/")
+        timing = response["Server-Timing"]
+        for name in ("total;dur=", "db;dur=", "SQL", "tpl;dur=", "cache;"):
+            self.assertIn(name, timing)
+
+    def test_server_timing_disabled(self):
+        """По умолчанию заголовка нет, метрики при этом собираются."""
+        response = self.client.get("/about/author/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertIn('view="about:author"', registry.render())
+
+    def test_histograms_by_url_name(self):
+        """Гистограммы копятся по имени адреса, а не по пути."""
+        self.client.get("/")
+        self.client.get("/")
+        self.client.get("/sdfvscs/")
+        text = registry.render()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text,
+        )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 2', text
+        )
+        self.assertIn(
+            'yatube_responses_total{view="unresolved",status="404"} 1', text
+        )
+        self.assertIn(
+            'yatube_template_duration_seconds_count{view="posts:index"} 2',
+            text,
+        )
+
+
+class MetricsTests(TestCase):
+    def test_query_counting(self):
+        """Обёртка execute_wrapper считает запросы и их время."""
+        metrics = RequestMetrics()
+        result = metrics(lambda *args: "rows", "SELECT 1", None, False, {})
+        self.assertEqual(result, "rows")
+        self.assertEqual(metrics.queries, 1)
+
+    def test_label_escaping(self):
+        """Кавычки и переводы строк в метках экранируются."""
+        registry.reset()
+        registry.observe('a"b\nc', 200, RequestMetrics())
+        self.assertIn('view="a\\"b\\nc"', registry.render())
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_endpoint_access(self):
+        """Метрики видят персонал и запросы с токеном."""
+        client = Client()
+        self.assertEqual(client.get("/metrics/").status_code, 401)
+        self.assertEqual(
+            client.get(
+                "/metrics/", HTTP_AUTHORIZATION="Bearer wrong"
+            ).status_code,
+            401,
+        )
+        response = client.get("/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            "# TYPE yatube_request_duration_seconds histogram",
+            response.content.decode(),
+        )
+        staff = get_user_model().objects.create_user(
+            "admin", "admin@mail.ru", "12345678", is_staff=True
+        )
+        client.force_login(staff)
+        self.assertEqual(client.get("/metrics/").status_code, 200)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_empty_token_is_not_accepted(self):
+        """Без настроенного токена пустой Bearer не пускает."""
+        response = Client().get("/metrics/", HTTP_AUTHORIZATION="Bearer ")
+        self.assertEqual(response.status_code, 401)
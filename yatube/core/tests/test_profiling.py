@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from core import profiling
+
+
+class ProfilingTests(SimpleTestCase):
+    def test_token(self):
+        """Токен открывает профайлер, поддельный и просроченный — нет."""
+        token = profiling.make_token("sampling")
+        self.assertEqual(profiling.read_token(token), "sampling")
+        self.assertIsNone(profiling.read_token(token + "x"))
+        self.assertIsNone(profiling.read_token("sampling"))
+        with override_settings(PROFILING_TOKEN_MAX_AGE=-1):
+            self.assertIsNone(profiling.read_token(token))
+
+    def test_breakdown(self):
+        """Сэмпл относится к самой глубокой категории стека."""
+        template = "render (django/template/base.py:1)"
+        query = "execute (django/db/models/sql/compiler.py:2)"
+        view = "index (posts/views.py:3)"
+        self.assertEqual(profiling.category(f"{view};{template}"), "templates")
+        self.assertEqual(
+            profiling.category(f"{view};{template};{query}"), "orm"
+        )
+        self.assertEqual(
+            profiling.breakdown({f"{view};{template}": 1, view: 3}),
+            {"python": 0.75, "templates": 0.25},
+        )
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        settings = override_settings(PROFILING_DIR=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.client = Client()
+
+    def stored(self, view):
+        directory = os.path.join(self.root, view)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.listdir(directory))
+
+    def test_signed_header(self):
+        """Запрос с токеном профилируется и получает путь к профилю."""
+        response = self.client.get(
+            "/", HTTP_X_PROFILE=profiling.make_token("cprofile")
+        )
+        self.assertTrue(response["X-Profile"].startswith("posts.index/"))
+        self.assertTrue(response["X-Profile"].endswith(".prof"))
+        self.assertTrue(
+            os.path.exists(os.path.join(self.root, response["X-Profile"]))
+        )
+        response = self.client.get("/", HTTP_X_PROFILE="cprofile")
+        self.assertNotIn("X-Profile", response)
+
+    def test_query_parameter_for_staff_only(self):
+        """?profile работает только у персонала."""
+        response = self.client.get("/about/author/?profile=1")
+        self.assertNotIn("X-Profile", response)
+        self.assertEqual(self.stored("about.author"), [])
+        staff = get_user_model().objects.create_user(
+            "admin", "admin@mail.ru", "12345678", is_staff=True
+        )
+        self.client.force_login(staff)
+        response = self.client.get("/about/author/?profile=sampling")
+        self.assertTrue(response["X-Profile"].endswith(".folded"))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_KEEP=2)
+    def test_random_sampling(self):
+        """Случайная выборка только сохраняет последние профили."""
+        for _ in range(3):
+            response = self.client.get("/about/tech/")
+            self.assertNotIn("X-Profile", response)
+        stored = self.stored("about.tech")
+        self.assertEqual(len(stored), 2)
+        self.assertTrue(all(name.endswith(".folded") for name in stored))
+
+    def test_profiles_command(self):
+        """Команда показывает разбивку времени по сохранённым профилям."""
+        self.client.get("/", HTTP_X_PROFILE=profiling.make_token("cprofile"))
+        out = StringIO()
+        call_command("profiles", "--view", "posts:index", stdout=out)
+        self.assertIn("posts:index", out.getvalue())
+        self.assertIn("templates", out.getvalue())
@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from core.queries import fingerprint, stats
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_literals_are_normalized(self):
+        """Значения заменяются на ?, списки сворачиваются."""
+        self.assertEqual(
+            fingerprint(
+                'SELECT "t1"."id" FROM "posts_post" WHERE "text" = \'it\'\'s\''
+                " AND \"id\" IN (1, 2, 3) AND \"score\" > -0.5\n  LIMIT 21"
+            ),
+            'SELECT "t1"."id" FROM "posts_post" WHERE "text" = ? '
+            'AND "id" IN (...) AND "score" > ? LIMIT ?',
+        )
+
+    def test_placeholders_and_rows(self):
+        """Запросы с разным числом параметров дают один отпечаток."""
+        self.assertEqual(
+            fingerprint('INSERT INTO "t" ("a") VALUES (%s, %s), (%s, %s)'),
+            fingerprint('INSERT INTO "t" ("a") VALUES (%s, %s)'),
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s)'),
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s)'),
+        )
+
+
+class SlowQueryLogTests(TestCase):
+    @override_settings(SLOW_QUERY_MS=1e-6)
+    def test_slow_queries_are_logged_with_view(self):
+        """Медленный запрос попадает в журнал с представлением и кодом."""
+        with self.assertLogs("core.queries", "WARNING") as logs:
+            Client().get("/")
+        message = logs.output[0]
+        self.assertIn("posts:index", message)
+        self.assertIn(os.path.join("yatube", "posts"), message)
+
+    def test_disabled_by_default(self):
+        """По умолчанию журнал молчит."""
+        with self.assertRaises(AssertionError):
+            with self.assertLogs("core.queries", "WARNING"):
+                Client().get("/")
+
+
+class QueryStatsTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        location = os.path.join(self.tmp_dir, "query_stats.sqlite3")
+        settings = override_settings(
+            QUERY_STATS=True, QUERY_STATS_LOCATION=location
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        stats.reset()
+
+    def top(self, *args):
+        out = StringIO()
+        call_command("top_queries", "--json", *args, stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_counts_per_fingerprint_and_view(self):
+        """Одинаковые запросы складываются, представления перечисляются."""
+        client = Client()
+        client.get("/")
+        client.get("/")
+        client.get("/about/author/")
+        rows = self.top("--limit", "50", "--order", "count")
+        self.assertTrue(rows)
+        self.assertIn("posts:index", rows[0]["views"])
+        self.assertGreaterEqual(rows[0]["count"], 2)
+        self.assertEqual(len({row["fingerprint"] for row in rows}), len(rows))
+        only_index = self.top("--view", "posts:index")
+        self.assertTrue(all(
+            row["views"] == ["posts:index"] for row in only_index
+        ))
+
+    def test_table_and_reset(self):
+        """Команда печатает таблицу и очищает статистику."""
+        Client().get("/")
+        out = StringIO()
+        call_command("top_queries", "--reset", stdout=out)
+        self.assertIn("posts:index", out.getvalue())
+        self.assertEqual(self.top(), [])
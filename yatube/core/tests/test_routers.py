@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TransactionTestCase, override_settings,
+)
+
+from core.middleware import ReplicaMiddleware
+from core.routers import ReplicaRouter, replica_reads
+from posts.models import Post
+
+router = ReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRouterTests(TransactionTestCase):
+    def test_reads_outside_requests_use_primary(self):
+        """Команды и фоновые потоки читают основную базу."""
+        self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_reads_inside_replica_requests(self):
+        """Разрешённый запрос читает с реплики, но не внутри транзакции."""
+        with replica_reads(True):
+            self.assertEqual(router.db_for_read(Post), "replica1")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Post), "default")
+        with replica_reads(False):
+            self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_writes_go_to_primary(self):
+        """Запись идёт в основную базу и отмечается в состоянии запроса."""
+        with replica_reads(True) as state:
+            self.assertEqual(router.db_for_write(Post), "default")
+        self.assertTrue(state.wrote)
+        self.assertFalse(router.allow_migrate("replica1", "posts"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.used = []
+
+    def view(self, write=False):
+        def get_response(request):
+            self.used.append(router.db_for_read(Post))
+            if write:
+                router.db_for_write(Post)
+            return HttpResponse()
+
+        return ReplicaMiddleware(get_response)
+
+    def test_get_reads_replica(self):
+        """GET без недавней записи читает реплику и не ставит cookie."""
+        response = self.view()(self.factory.get("/"))
+        self.assertEqual(self.used, ["replica1"])
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_post_reads_primary(self):
+        """POST читает основную базу."""
+        self.view()(self.factory.post("/"))
+        self.assertEqual(self.used, ["default"])
+
+    def test_read_your_writes(self):
+        """После записи пользователь какое-то время читает основную базу."""
+        response = self.view(write=True)(self.factory.post("/"))
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        request = self.factory.get("/")
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = cookie.value
+        self.view()(request)
+        self.assertEqual(self.used[-1], "default")
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = str(
+            int(time.time()) - 1
+        )
+        self.view()(request)
+        self.assertEqual(self.used[-1], "replica1")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Без реплик всё читается из основной базы и cookie не нужна."""
+        response = self.view(write=True)(self.factory.get("/"))
+        self.assertEqual(self.used, ["default"])
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
@@ -1,4 +1,11 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
+from .cache import stats
 
 
 def page_not_found(request, exception):
@@ -11,3 +18,26 @@ def csrf_token(request, reason=""):
 
 def server_error(request, reason=""):
     return render(request, "core/500.html")
+
+
+@staff_member_required
+def cache_stats(request):
+    return JsonResponse(stats.snapshot())
+
+
+def metrics_view(request):
+    """Метрики для Prometheus: персоналу или по ``METRICS_TOKEN``."""
+    token = settings.METRICS_TOKEN
+    authorized = request.user.is_active and request.user.is_staff or (
+        token and constant_time_compare(
+            request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}"
+        )
+    )
+    if not authorized:
+        response = HttpResponse(status=401)
+        response["WWW-Authenticate"] = "Bearer"
+        return response
+    return HttpResponse(
+        metrics.registry.render(cache_stats=stats.snapshot()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
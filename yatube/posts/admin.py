@@ -1,9 +1,17 @@
+from django import forms
 from django.contrib import admin
 
+from .forms import clean_post_image
 from .models import Group, Post
 
 
+class PostAdminForm(forms.ModelForm):
+    def clean_image(self):
+        return clean_post_image(self.cleaned_data.get("image"))
+
+
 class PostAdmin(admin.ModelAdmin):
+    form = PostAdminForm
     list_display = ("pk", "text", "pub_date", "author")
     search_fields = ("text",)
     list_filter = ("pub_date",)
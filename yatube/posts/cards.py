@@ -0,0 +1,51 @@
+"""Кэш отрисованных карточек постов, общий для всех лент.
+
+Карточка не зависит от пользователя, поэтому её можно отдавать всем.
+Ключ включает отпечаток данных, которые попадают в карточку: после
+правки поста, автора или группы старая карточка просто не находится.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core.cache import stats
+
+CARD_TEMPLATE = "posts/includes/post_card.html"
+
+
+def card_key(post):
+    group = post.group
+    parts = (
+        settings.POST_CARD_VERSION,
+        post.pub_date.isoformat(),
+        post.text,
+        post.image.name or "",
+        post.thumbnails,
+        post.comments_count,
+        post.author.username,
+        post.author.get_full_name(),
+        group.slug if group else "",
+        group.title if group else "",
+    )
+    stamp = hashlib.md5("\x1f".join(map(str, parts)).encode()).hexdigest()
+    return f"post_card:{post.pk}:{stamp}"
+
+
+def render_cards(posts):
+    """Прикрепляет к постам готовую разметку ``post.card``."""
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    cached = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            card = render_to_string(CARD_TEMPLATE, {"post": post})
+            missing[key] = card
+        post.card = card
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_TIMEOUT)
+    stats.record("post_card", hits=len(cached), misses=len(missing))
+    return posts
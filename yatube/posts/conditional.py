@@ -0,0 +1,129 @@
+"""Условные GET и заголовки кэширования HTML-страниц.
+
+Дата изменения страницы — самый новый ``pub_date`` того, что на ней
+видно, или время выдачи токенов её поколений из ``invalidation``, если
+оно позже: правка поста или комментарий меняют только страницы, где
+виден этот пост. ETag добавляет к токенам и дате пользователя и
+CSRF-cookie: страница залогиненного пользователя отличается от
+анонимной. Анонимные страницы можно кэшировать на CDN (``s-maxage``),
+остальные только в браузере и с обязательной перепроверкой.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import feed, invalidation
+from .models import Comment, Group, Post, User
+
+
+def _state(names, *dates):
+    tokens, modified = invalidation.page_state(names)
+    latest = datetime.fromtimestamp(modified, timezone.utc)
+    return tokens, max([latest, *filter(None, dates)])
+
+
+def _newest(posts):
+    return posts.aggregate(newest=Max("pub_date"))["newest"]
+
+
+def index_state(request):
+    return _state(
+        invalidation.index_generations(), _newest(Post.objects.all())
+    )
+
+
+def group_state(request, slug):
+    group_id, newest = Group.objects.filter(slug=slug).annotate(
+        newest=Max("posts__pub_date")
+    ).values_list("pk", "newest").first() or (None, None)
+    return _state(invalidation.group_generations(group_id), newest)
+
+
+def profile_state(request, username):
+    author_id, newest = User.objects.filter(username=username).annotate(
+        newest=Max("posts__pub_date")
+    ).values_list("pk", "newest").first() or (None, None)
+    return _state(invalidation.profile_generations(author_id), newest)
+
+
+def post_state(request, post_id):
+    """Новые посты автора меняют его счётчик, комментарии — список."""
+    author_posts = Post.objects.filter(
+        author=OuterRef("author")
+    ).order_by("-pub_date").values("pub_date")[:1]
+    comments = Comment.objects.filter(
+        post=OuterRef("pk")
+    ).order_by("-pub_date").values("pub_date")[:1]
+    author_id, *dates = Post.objects.filter(pk=post_id).annotate(
+        author_newest=Subquery(author_posts),
+        comment_newest=Subquery(comments),
+    ).values_list(
+        "author_id", "author_newest", "comment_newest"
+    ).first() or (None,)
+    return _state(
+        invalidation.post_generations(post_id)
+        + invalidation.profile_generations(author_id),
+        *dates,
+    )
+
+
+def follow_state(request):
+    return _state(
+        invalidation.follow_generations(request.user.pk),
+        _newest(feed.get_feed(request.user)),
+    )
+
+
+def conditional_page(state_func):
+    """``condition()`` с одной датой на ETag и Last-Modified и Vary/CC.
+
+    ``state_func`` возвращает токены поколений страницы и дату её правки.
+    """
+
+    def state(request, *args, **kwargs):
+        if not hasattr(request, "page_state"):
+            request.page_state = state_func(request, *args, **kwargs)
+        return request.page_state
+
+    def last_modified(request, *args, **kwargs):
+        return state(request, *args, **kwargs)[1]
+
+    def etag(request, *args, **kwargs):
+        tokens, modified = state(request, *args, **kwargs)
+        parts = [
+            request.get_full_path(),
+            str(request.user.pk),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+            *tokens,
+            modified.isoformat(),
+        ]
+        return hashlib.md5("\x1f".join(parts).encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_vary_headers(response, ("Cookie",))
+            if request.user.is_authenticated or response.cookies:
+                patch_cache_control(response, private=True, no_cache=True)
+            elif response.status_code in (200, 304):
+                patch_cache_control(
+                    response,
+                    public=True,
+                    max_age=0,
+                    s_maxage=settings.PAGE_CACHE_S_MAXAGE,
+                )
+            return response
+
+        return inner
+
+    return decorator
@@ -0,0 +1,63 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарно через ``F()`` из сигналов моделей, а
+``reconcile`` пересчитывает их одним UPDATE на таблицу, если они
+разъехались с реальными данными.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from core.db import bulk_batch_size
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def bump_user(user_id, field, delta):
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F("comments_count") + delta
+    )
+
+
+def _count(model, field, ref="pk"):
+    rows = (
+        model.objects.filter(**{field: OuterRef(ref)})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def reconcile():
+    """Чинит расхождения; возвращает число исправленных строк."""
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list("pk", flat=True)
+        ),
+        batch_size=bulk_batch_size(UserStats, 1000),
+    )
+    user_counts = {
+        "posts_count": _count(Post, "author", "user"),
+        "followers_count": _count(Follow, "author", "user"),
+        "following_count": _count(Follow, "user", "user"),
+    }
+    post_counts = {"comments_count": _count(Comment, "post")}
+    repaired = 0
+    for model, counts in ((UserStats, user_counts), (Post, post_counts)):
+        actual = {f"actual_{name}": value for name, value in counts.items()}
+        drift = Q()
+        for name in counts:
+            drift |= ~Q(**{name: F(f"actual_{name}")})
+        repaired += model.objects.annotate(**actual).filter(drift).count()
+        model.objects.update(**counts)
+    return repaired
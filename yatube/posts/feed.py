@@ -0,0 +1,210 @@
+"""Лента подписок с раздачей постов при записи (fan-out-on-write).
+
+Новый пост сразу раскладывается в ``FeedEntry`` всех подписчиков автора,
+поэтому страница ``/follow/`` читает один диапазон по индексу
+``(owner, -pub_date)``. Для авторов, у которых подписчиков не меньше
+``FEED_FANOUT_LIMIT``, раздача не делается: их посты подмешиваются
+при чтении (fan-out-on-read).
+"""
+import sqlite3
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Q
+
+from core.db import bulk_batch_size
+
+from .models import FeedEntry, Follow, Post
+
+PULL_AUTHORS_KEY = "feed:pull_authors"
+
+
+def _pull_authors():
+    return (
+        Follow.objects.order_by().values("author")
+        .annotate(followers=Count("id"))
+        .filter(followers__gte=settings.FEED_FANOUT_LIMIT)
+        .values("author")
+    )
+
+
+def pull_author_ids():
+    """Авторы, чьи посты не раздаются по лентам, а читаются на лету."""
+
+    def compute():
+        return frozenset(
+            _pull_authors().values_list("author", flat=True)
+        )
+
+    return cache.get_or_set(
+        PULL_AUTHORS_KEY, compute, settings.FEED_PULL_AUTHORS_TIMEOUT
+    )
+
+
+def _entry(owner_id, post):
+    return FeedEntry(
+        owner_id=owner_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def _bulk_insert(entries):
+    FeedEntry.objects.bulk_create(
+        entries,
+        batch_size=bulk_batch_size(FeedEntry, settings.FEED_BATCH_SIZE),
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    if post.author_id in pull_author_ids():
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    _bulk_insert(_entry(owner_id, post) for owner_id in followers.iterator())
+
+
+def backfill(follow):
+    """Докладывает в ленту последние посты автора после подписки."""
+    if follow.author_id in pull_author_ids():
+        return
+    posts = Post.objects.filter(author_id=follow.author_id).only(
+        "id", "author_id", "pub_date"
+    )[:settings.FEED_BACKFILL_LIMIT]
+    _bulk_insert(_entry(follow.user_id, post) for post in posts)
+
+
+def prune(follow):
+    FeedEntry.objects.filter(
+        owner_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+
+
+def followers_changed(author_id, delta):
+    """Переводит автора между раздачей и чтением на лету.
+
+    Пока автор читался на лету, его новые посты и подписки на него
+    в ленты не попадали, поэтому при возврате к раздаче его последние
+    посты заново раскладываются по лентам всех подписчиков.
+    """
+    followers = Follow.objects.filter(author_id=author_id).count()
+    limit = settings.FEED_FANOUT_LIMIT
+    if followers != (limit if delta > 0 else limit - 1):
+        return
+    cache.delete(PULL_AUTHORS_KEY)
+    if delta > 0:
+        return
+    connection = connections[router.db_for_write(FeedEntry)]
+    with transaction.atomic(using=connection.alias):
+        FeedEntry.objects.filter(author_id=author_id).delete()
+        if _supports_window_functions(connection):
+            _fill(connection, authors=[author_id])
+            return
+        for follow in Follow.objects.filter(author_id=author_id):
+            backfill(follow)
+
+
+def rebuild_user(user_id):
+    with transaction.atomic():
+        FeedEntry.objects.filter(owner_id=user_id).delete()
+        for follow in Follow.objects.filter(user_id=user_id):
+            backfill(follow)
+
+
+def _supports_window_functions(connection):
+    # У SQLite в Django 2.2 нет этого флага, хотя окна есть с 3.25.
+    if connection.vendor == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 25)
+    return connection.features.supports_over_clause
+
+
+def _fill(connection, owners=None, authors=None):
+    """Раскладывает последние посты подписок одним INSERT ... SELECT.
+
+    ``owners`` — queryset с id владельцев лент. Он и список авторов для
+    чтения на лету подставляются подзапросами: пустой ``IN ()`` —
+    ошибка синтаксиса в PostgreSQL, а длинный упирается в лимит
+    параметров SQLite. ``authors`` — короткий список id авторов:
+    если задан, раскладываются только их посты.
+    """
+    posts, params = "", []
+    if authors is not None:
+        posts = f" WHERE author_id IN ({', '.join(['%s'] * len(authors))})"
+        params += authors
+    conditions = ["post.number <= %s"]
+    params.append(settings.FEED_BACKFILL_LIMIT)
+    subqueries = [("follow.author_id NOT IN", _pull_authors())]
+    if owners is not None:
+        subqueries.append(("follow.user_id IN", owners))
+    for condition, queryset in subqueries:
+        sql, subquery_params = queryset.query.get_compiler(
+            connection=connection
+        ).as_sql()
+        conditions.append(f"{condition} ({sql})")
+        params += subquery_params
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FeedEntry._meta.db_table} "
+            "(owner_id, post_id, author_id, pub_date) "
+            "SELECT follow.user_id, post.id, post.author_id, post.pub_date "
+            f"FROM {Follow._meta.db_table} AS follow "
+            "JOIN (SELECT id, author_id, pub_date, ROW_NUMBER() OVER ("
+            "PARTITION BY author_id ORDER BY pub_date DESC, id DESC"
+            f") AS number FROM {Post._meta.db_table}{posts}) AS post "
+            "ON post.author_id = follow.author_id "
+            f"WHERE {' AND '.join(conditions)} "
+            "ORDER BY follow.user_id, post.pub_date DESC, post.id DESC",
+            params,
+        )
+
+
+def rebuild(users=None):
+    """Пересобирает ленты с нуля; возвращает число пересобранных лент.
+
+    Где есть оконные функции, все ленты пишутся одним запросом:
+    по одному ``backfill`` на подписку это часы на больших базах.
+    """
+    owners = Follow.objects.order_by().values_list("user_id", flat=True)
+    entries = FeedEntry.objects.all()
+    if users is not None:
+        owners = owners.filter(user__in=users)
+        entries = entries.filter(owner__in=users)
+    # Сырой INSERT идёт в ту же базу, что и удаление через ORM.
+    connection = connections[router.db_for_write(FeedEntry)]
+    if not _supports_window_functions(connection):
+        entries.exclude(owner_id__in=owners).delete()
+        rebuilt = 0
+        for user_id in owners.distinct().iterator():
+            rebuild_user(user_id)
+            rebuilt += 1
+        return rebuilt
+    with transaction.atomic(using=connection.alias):
+        entries.delete()
+        rebuilt = owners.distinct().count()
+        if rebuilt:
+            _fill(connection, None if users is None else owners)
+    return rebuilt
+
+
+def get_feed(user):
+    """Посты подписок пользователя в обратном хронологическом порядке."""
+    pulled = pull_author_ids()
+    if pulled:
+        pulled = list(
+            Follow.objects.filter(
+                user=user, author_id__in=pulled
+            ).values_list("author_id", flat=True)
+        )
+    if not pulled:
+        return Post.objects.filter(feed_entries__owner=user).order_by(
+            F("feed_entries__pub_date").desc(),
+            F("feed_entries__post_id").desc(),
+        )
+    pushed = FeedEntry.objects.filter(owner=user).values("post_id")
+    return Post.objects.filter(
+        Q(pk__in=pushed) | Q(author_id__in=pulled)
+    ).order_by("-pub_date", "-pk")
@@ -1,6 +1,24 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
+from django.template.defaultfilters import filesizeformat
 
 from .models import Comment, Post
+from .thumbnails import strip_upload
+
+
+def clean_post_image(image):
+    """Проверка загруженной картинки поста по заголовку и чистка EXIF."""
+    if not isinstance(image, UploadedFile):
+        return image
+    # ImageField уже прочитал заголовок, пиксели ещё не декодированы.
+    width, height = image.image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            "Картинка слишком большая: %s×%s пикселей." % (width, height)
+        )
+    return strip_upload(image)
 
 
 class PostForm(ModelForm):
@@ -8,6 +26,26 @@ class PostForm(ModelForm):
         model = Post
         fields = ["text", "group", "image"]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Загрузчик обрезал такой файл, Pillow счёл бы его битым:
+        # убираем его из формы и показываем понятную ошибку.
+        image = self.files.get("image")
+        self.oversized = bool(
+            image and image.size > settings.POST_IMAGE_MAX_BYTES
+        )
+        if self.oversized:
+            self.files = self.files.copy()
+            del self.files["image"]
+
+    def clean_image(self):
+        if self.oversized:
+            raise ValidationError(
+                "Файл больше %s."
+                % filesizeformat(settings.POST_IMAGE_MAX_BYTES)
+            )
+        return clean_post_image(self.cleaned_data.get("image"))
+
 
 class CommentForm(ModelForm):
     class Meta:
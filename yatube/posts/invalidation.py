@@ -0,0 +1,109 @@
+"""Поколения кэша лент, которые сбрасываются сигналами моделей.
+
+Каждая лента кэширует только список id постов страницы под ключом,
+в который входят токены её поколений. Сигнал выдаёт новый токен — и
+старые страницы перестают находиться, без ``cache.clear()`` и без
+ожидания TTL. Сами посты читаются по первичному ключу, поэтому правки
+текста и новые комментарии видны сразу.
+
+Токен начинается со времени, когда он выдан: по токенам страницы
+считаются её ``Last-Modified`` и ETag, поэтому правка поста или новый
+комментарий меняют только страницы, где этот пост виден. Общее
+поколение ``gen:content`` сбрасывают лишь редкие правки, которые видны
+везде: смена имени автора или названия группы.
+
+Токены меняются только после коммита транзакции: иначе параллельный
+запрос успел бы закэшировать страницу со старыми данными уже под
+новым токеном, и она жила бы до следующей правки.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+PULL_GENERATION = "gen:pull"
+CONTENT_GENERATION = "gen:content"
+GROUPS_GENERATION = "gen:groups"
+
+
+def index_generations():
+    return ["gen:index"]
+
+
+def group_generations(group_id):
+    return [f"gen:group:{group_id}"]
+
+
+def profile_generations(author_id):
+    return [f"gen:profile:{author_id}"]
+
+
+def post_generations(post_id):
+    return [f"gen:post:{post_id}"]
+
+
+def follow_generation(user_id):
+    return f"gen:follow:{user_id}"
+
+
+def follow_generations(user_id):
+    return [follow_generation(user_id), PULL_GENERATION]
+
+
+def _token():
+    return f"{time.time():f}-{uuid.uuid4().hex}"
+
+
+def token_time(token):
+    """Время выдачи токена, секунды эпохи."""
+    return float(token.partition("-")[0])
+
+
+def get_tokens(names):
+    """Текущие токены поколений; потерянный ключ получает новый токен."""
+    tokens = cache.get_many(names)
+    missing = {name: _token() for name in names if name not in tokens}
+    if missing:
+        cache.set_many(missing, None)
+        tokens.update(missing)
+    return [tokens[name] for name in names]
+
+
+def page_state(names):
+    """Токены страницы вместе с общим поколением и время её правки."""
+    tokens = get_tokens([CONTENT_GENERATION, *names])
+    return tokens, max(map(token_time, tokens))
+
+
+def bump(*names):
+    if names:
+        transaction.on_commit(
+            lambda: cache.set_many({name: _token() for name in names}, None)
+        )
+
+
+def bump_post(post, pulled, group_ids=()):
+    """Сбрасывает пост и ленты, в которых он виден, появился или пропал."""
+    names = (
+        index_generations()
+        + profile_generations(post.author_id)
+        + post_generations(post.pk)
+    )
+    for group_id in {post.group_id, *group_ids} - {None}:
+        names += group_generations(group_id)
+    if pulled:
+        names.append(PULL_GENERATION)
+    else:
+        followers = Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list("user_id", flat=True)
+        for user_id in followers.iterator():
+            names.append(follow_generation(user_id))
+    bump(*names)
+
+
+def bump_content():
+    bump(CONTENT_GENERATION)
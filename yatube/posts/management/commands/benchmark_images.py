@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import image_formats
+
+
+def _pick(variants, needed):
+    """Имя варианта, который браузер выберет по srcset для нужной ширины."""
+    ordered = sorted(
+        (int(geometry.split("x")[0]), name)
+        for geometry, name in variants.items()
+    )
+    for width, name in ordered:
+        if width >= needed:
+            return name
+    return ordered[-1][1]
+
+
+def _size(name):
+    return default_storage.size(name) if default_storage.exists(name) else 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Считает, сколько байт картинок весит первая страница ленты "
+        "с вариантами srcset по сравнению с исходными файлами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--viewport",
+            type=int,
+            default=412,
+            help="Ширина экрана в CSS-пикселях (по умолчанию 412).",
+        )
+        parser.add_argument(
+            "--dpr",
+            type=float,
+            default=2.0,
+            help="Плотность пикселей экрана (по умолчанию 2).",
+        )
+
+    def handle(self, *args, **options):
+        needed = round(
+            min(options["viewport"], max(settings.POST_IMAGE_WIDTHS))
+            * options["dpr"]
+        )
+        posts = Post.objects.exclude(image="").exclude(image__isnull=True)
+        posts = posts[:settings.POSTS_PER_PAGE]
+        formats = image_formats()
+        original = 0
+        totals = dict.fromkeys(formats, 0)
+        for post in posts:
+            original += _size(post.image.name)
+            names = post.thumbnail_names
+            for image_format in formats:
+                variants = names.get(image_format) or names.get("jpeg")
+                totals[image_format] += (
+                    _size(_pick(variants, needed)) if variants
+                    else _size(post.image.name)
+                )
+        self.stdout.write(
+            f"Постов с картинками: {len(posts)}, "
+            f"нужная ширина: {needed}px"
+        )
+        self.stdout.write(f"исходные файлы: {original} байт")
+        for image_format, total in totals.items():
+            saved = original - total
+            percent = saved * 100 / original if original else 0
+            self.stdout.write(
+                f"{image_format}: {total} байт, "
+                f"экономия {saved} байт ({percent:.0f}%)"
+            )
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.models import Post
+
+
+def _measure(function, repeat):
+    """Среднее время вызова в миллисекундах и число найденных постов."""
+    found = function()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) * 1000 / repeat, len(found)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает поиск по индексу с LIKE '%запрос%' по тексту постов, "
+        "как в поиске админки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "queries",
+            nargs="*",
+            help="Запросы; по умолчанию слова из случайных постов.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Сколько раз повторить каждый запрос (по умолчанию 20).",
+        )
+
+    def handle(self, *args, **options):
+        queries = options["queries"] or self.sample_queries()
+        repeat = options["repeat"]
+        total_like = total_index = 0
+        for query in queries:
+            like_ms, like_found = _measure(
+                lambda: list(
+                    Post.objects.filter(text__icontains=query)
+                    .values_list("pk", flat=True)
+                ),
+                repeat,
+            )
+            index_ms, index_found = _measure(
+                lambda: search.search_ids(query), repeat
+            )
+            total_like += like_ms
+            total_index += index_ms
+            self.stdout.write(
+                f"{query!r}: LIKE {like_ms:.2f} мс ({like_found}), "
+                f"индекс {index_ms:.2f} мс ({index_found})"
+            )
+        if total_index:
+            self.stdout.write(
+                f"Индекс быстрее в {total_like / total_index:.1f} раз"
+            )
+
+    def sample_queries(self, count=5):
+        texts = Post.objects.order_by("?").values_list("text", flat=True)
+        words = [
+            word for text in texts[:50]
+            for word in search.WORD_RE.findall(text) if len(word) > 3
+        ]
+        return random.sample(words, min(count, len(words)))
@@ -0,0 +1,240 @@
+import json
+import time
+from contextlib import ExitStack
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+
+from posts import search, seeding
+from posts.models import Comment, Follow, Group, Post, User
+
+NAMESPACES = ("posts", "users", "about")
+
+# Страницам не под анонимом, не GET или с параметрами нужны свои запросы.
+# Запросы выполняются по-настоящему: add_comment пишет комментарии,
+# profile_follow и profile_unfollow подписывают и отписывают читателя.
+# Запрос из "before" выполняется перед каждым замером и не замеряется.
+REQUESTS = {
+    "posts:new_post": {"user": "author"},
+    "posts:post_edit": {"user": "author"},
+    "posts:add_comment": {
+        "user": "reader",
+        "method": "post",
+        "data": {"text": "Комментарий"},
+    },
+    "posts:follow_index": {"user": "reader"},
+    "posts:profile_follow": {"user": "reader"},
+    "posts:profile_unfollow": {
+        "user": "reader",
+        "before": "posts:profile_follow",
+    },
+}
+
+
+def routes():
+    """Имена и параметры всех адресов приложений из NAMESPACES."""
+    namespaces = get_resolver().namespace_dict
+    for namespace in NAMESPACES:
+        for pattern in namespaces[namespace][1].url_patterns:
+            converters = list(pattern.pattern.converters)
+            yield f"{namespace}:{pattern.name}", converters
+
+
+def percentile(ordered, percent):
+    index = round(percent / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк всех адресов posts, users и about: перцентили задержки "
+        "и число SQL-запросов на запрос. С --seed сначала создаёт "
+        "синтетические данные, с --json сохраняет результат, "
+        "с --compare сравнивает с прошлым прогоном."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Сначала создать данные (--users, --posts и т. д.).",
+        )
+        for name, default in (
+            ("users", 1000),
+            ("groups", 20),
+            ("posts", 20000),
+            ("comments", 50000),
+            ("follows", 10000),
+        ):
+            parser.add_argument(
+                f"--{name}",
+                type=int,
+                default=default,
+                help=f"Сколько создать с --seed (по умолчанию {default}).",
+            )
+        parser.add_argument(
+            "--random-seed",
+            type=int,
+            default=0,
+            help="Зерно генератора данных (по умолчанию 0).",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Замеров на адрес (по умолчанию 50).",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=3,
+            help="Незамеряемых запросов перед замерами (по умолчанию 3).",
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Очищать кэш перед каждым запросом.",
+        )
+        parser.add_argument("--json", help="Файл для результатов.")
+        parser.add_argument(
+            "--compare", help="Результаты прошлого прогона для сравнения."
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            started = time.perf_counter()
+            created = seeding.seed(
+                users=options["users"],
+                groups=options["groups"],
+                posts=options["posts"],
+                comments=options["comments"],
+                follows=options["follows"],
+                random_seed=options["random_seed"],
+            )
+            counts = ", ".join(
+                f"{name} {count}" for name, count in created.items()
+            )
+            self.stdout.write(
+                f"Данные созданы за {time.perf_counter() - started:.1f} с: "
+                f"{counts}"
+            )
+        author = User.objects.order_by("-stats__followers_count").first()
+        post = Post.objects.filter(author=author).order_by(
+            "-comments_count"
+        ).first()
+        if post is None:
+            raise CommandError("В базе нет постов: запустите с --seed.")
+        self.clients = {None: Client(), "author": Client(), "reader": Client()}
+        self.clients["author"].force_login(author)
+        self.clients["reader"].force_login(
+            User.objects.exclude(pk=author.pk)
+            .order_by("-stats__following_count").first() or author
+        )
+        kwargs = {
+            "username": author.username,
+            "slug": (post.group or Group.objects.first() or Group()).slug,
+            "post_id": post.pk,
+        }
+        words = search.WORD_RE.findall(post.text)
+        results = {}
+        with override_settings(DEBUG=False):
+            for name, converters in routes():
+                spec = {"data": {"q": words[0]}} if (
+                    name == "posts:search" and words
+                ) else REQUESTS.get(name, {})
+                url = reverse(name, kwargs={
+                    key: kwargs[key] for key in converters
+                })
+                if "before" in spec:
+                    spec = dict(spec, before=reverse(
+                        spec["before"], kwargs={"username": author.username}
+                    ))
+                results[name] = self.measure(url, spec, options)
+                self.write_result(name, results[name])
+        report = {
+            "django": django.get_version(),
+            "dataset": {
+                "users": User.objects.count(),
+                "groups": Group.objects.count(),
+                "posts": Post.objects.count(),
+                "comments": Comment.objects.count(),
+                "follows": Follow.objects.count(),
+            },
+            "requests": options["requests"],
+            "cold": options["cold"],
+            "routes": results,
+        }
+        if options["json"]:
+            with open(options["json"], "w") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                self.compare(json.load(file)["routes"], results)
+
+    def measure(self, url, spec, options):
+        client = self.clients[spec.get("user")]
+        request = getattr(client, spec.get("method", "get"))
+        data = spec.get("data", {})
+
+        def prepare():
+            if "before" in spec:
+                client.get(spec["before"])
+
+        for _ in range(options["warmup"]):
+            prepare()
+            request(url, data)
+        timings = []
+        queries = []
+        for _ in range(options["requests"]):
+            prepare()
+            if options["cold"]:
+                cache.clear()
+            with ExitStack() as stack:
+                captured = [
+                    stack.enter_context(CaptureQueriesContext(connection))
+                    for connection in connections.all()
+                ]
+                started = time.perf_counter()
+                response = request(url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(sum(len(context) for context in captured))
+        timings.sort()
+        return {
+            "url": url,
+            "method": spec.get("method", "get").upper(),
+            "status": response.status_code,
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p90_ms": round(percentile(timings, 90), 2),
+            "p99_ms": round(percentile(timings, 99), 2),
+            "max_ms": round(timings[-1], 2),
+            "queries": round(sum(queries) / len(queries), 1),
+        }
+
+    def write_result(self, name, result):
+        self.stdout.write(
+            f"{name:24} {result['status']} "
+            f"p50 {result['p50_ms']:7.2f} мс  p90 {result['p90_ms']:7.2f} мс  "
+            f"p99 {result['p99_ms']:7.2f} мс  SQL {result['queries']}"
+        )
+
+    def compare(self, before, after):
+        self.stdout.write("Сравнение с прошлым прогоном (p50, SQL):")
+        for name, result in after.items():
+            old = before.get(name)
+            if old is None:
+                self.stdout.write(f"{name:24} новый адрес")
+                continue
+            change = (
+                (result["p50_ms"] - old["p50_ms"]) * 100 / old["p50_ms"]
+                if old["p50_ms"] else 0
+            )
+            self.stdout.write(
+                f"{name:24} {old['p50_ms']:7.2f} -> {result['p50_ms']:7.2f} "
+                f"мс ({change:+.0f}%), SQL {old['queries']} -> "
+                f"{result['queries']}"
+            )
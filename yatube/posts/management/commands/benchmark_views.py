@@ -0,0 +1,68 @@
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Меряет пропускную способность представлений постов в процессе, "
+        "без сети: запросов в секунду на каждую страницу. Числа разных "
+        "версий Django сравнимы на одной и той же базе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Запросов на страницу (по умолчанию 200).",
+        )
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related("author", "group").last()
+        if post is None:
+            raise CommandError("В базе нет постов.")
+        reader = (
+            User.objects.annotate(following_count=Count("follower"))
+            .order_by("-following_count").first()
+        )
+        group = post.group or Group.objects.first()
+        pages = [
+            ("posts:index", reverse("posts:index"), None),
+            ("posts:profile", reverse(
+                "posts:profile", args=[post.author.username]
+            ), None),
+            ("posts:post_detail", reverse(
+                "posts:post_detail", args=[post.pk]
+            ), None),
+            ("posts:follow_index", reverse("posts:follow_index"), reader),
+        ]
+        if group is not None:
+            pages.insert(1, ("posts:group_posts", reverse(
+                "posts:group_posts", args=[group.slug]
+            ), None))
+        self.stdout.write(f"Django {django.get_version()}")
+        # Как в продакшене: без debug_toolbar и записи SQL в память.
+        with override_settings(DEBUG=False):
+            for name, url, user in pages:
+                self.measure(name, url, user, options["requests"])
+
+    def measure(self, name, url, user, requests):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        client.get(url)
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = client.get(url)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{name}: {requests / elapsed:.0f} запросов/с "
+            f"({response.status_code})"
+        )
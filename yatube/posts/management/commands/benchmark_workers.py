@@ -0,0 +1,128 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _request(host, path):
+    return (
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode()
+
+
+async def _slow_client(host, port, path, seconds):
+    """Передаёт запрос по байту, пока не выйдет время, и читает ответ."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    request = _request(host, path)
+    delay = seconds / len(request)
+    try:
+        for byte in range(len(request)):
+            writer.write(request[byte:byte + 1])
+            await writer.drain()
+            await asyncio.sleep(delay)
+        await reader.read()
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _fast_client(host, port, path, deadline, latencies, errors):
+    """Обычный клиент: запрос за запросом, пока не выйдет время."""
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(_request(host, path))
+            status = await reader.readline()
+            await reader.read()
+            writer.close()
+        except OSError:
+            errors.append(None)
+            await asyncio.sleep(0.1)
+            continue
+        if b" 200 " in status or b" 304 " in status:
+            latencies.append((time.monotonic() - started) * 1000)
+        else:
+            errors.append(status)
+
+
+async def _run(host, port, path, options):
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + options["duration"]
+    slow = [
+        _slow_client(host, port, path, options["duration"])
+        for _ in range(options["slow"])
+    ]
+    fast = [
+        _fast_client(host, port, path, deadline, latencies, errors)
+        for _ in range(options["concurrency"])
+    ]
+    await asyncio.gather(*fast, *slow)
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест уже запущенного сервера: медленные клиенты "
+        "держат соединения, обычные меряют задержку и пропускную "
+        "способность. Запускается против sync- и ASGI-воркеров по очереди."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "url", help="Адрес страницы, например http://127.0.0.1:8000/."
+        )
+        parser.add_argument(
+            "--slow",
+            type=int,
+            default=50,
+            help="Число медленных клиентов (по умолчанию 50).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Число обычных клиентов (по умолчанию 10).",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=10.0,
+            help="Длительность теста в секундах (по умолчанию 10).",
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("Нужен адрес вида http://host:port/path.")
+        path = url.path or "/"
+        if url.query:
+            path = f"{path}?{url.query}"
+        latencies, errors = asyncio.run(
+            _run(url.hostname, url.port or 80, path, options)
+        )
+        self.stdout.write(
+            f"Медленных клиентов: {options['slow']}, "
+            f"обычных: {options['concurrency']}, "
+            f"{options['duration']:.0f} с"
+        )
+        self.stdout.write(
+            f"ответов: {len(latencies)} "
+            f"({len(latencies) / options['duration']:.1f} в секунду), "
+            f"ошибок: {len(errors)}"
+        )
+        if len(latencies) > 1:
+            percentiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"задержка p50 {percentiles[49]:.1f} мс, "
+                f"p95 {percentiles[94]:.1f} мс, "
+                f"max {max(latencies):.1f} мс"
+            )
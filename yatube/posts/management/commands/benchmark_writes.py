@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Параллельные комментаторы и читатели против настроенной базы: "
+        "сколько комментариев и страниц в секунду проходит и сколько "
+        "запросов падает на блокировке."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--writers",
+            type=int,
+            default=8,
+            help="Потоков, которые пишут комментарии (по умолчанию 8).",
+        )
+        parser.add_argument(
+            "--readers",
+            type=int,
+            default=4,
+            help="Потоков, которые читают страницу поста (по умолчанию 4).",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=10.0,
+            help="Длительность теста в секундах (по умолчанию 10).",
+        )
+        parser.add_argument(
+            "--journal-mode",
+            help="Режим журнала SQLite вместо SQLITE_PRAGMAS, например "
+            "delete.",
+        )
+        parser.add_argument(
+            "--busy-timeout",
+            type=int,
+            help="busy_timeout SQLite в мс вместо SQLITE_PRAGMAS.",
+        )
+
+    def handle(self, *args, **options):
+        posts = list(Post.objects.values_list("pk", flat=True)[:100])
+        users = list(User.objects.all()[:options["writers"]])
+        if not posts or not users:
+            raise CommandError("Нужны хотя бы один пост и один пользователь.")
+        pragmas = dict(settings.SQLITE_PRAGMAS)
+        if options["journal_mode"]:
+            pragmas["journal_mode"] = options["journal_mode"]
+        if options["busy_timeout"] is not None:
+            pragmas["busy_timeout"] = options["busy_timeout"]
+        writers = []
+        for number in range(options["writers"]):
+            client = Client()
+            client.force_login(users[number % len(users)])
+            writers.append(client)
+        # Новые PRAGMA применяются только к новым соединениям.
+        connections.close_all()
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        deadline = time.monotonic() + options["duration"]
+        threads = [
+            threading.Thread(target=self.write, args=(client, posts, deadline))
+            for client in writers
+        ] + [
+            threading.Thread(target=self.read, args=(posts, deadline))
+            for _ in range(options["readers"])
+        ]
+        with override_settings(DEBUG=False, SQLITE_PRAGMAS=pragmas):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        duration = options["duration"]
+        if connection.vendor == "sqlite":
+            self.stdout.write(
+                f"SQLite: journal_mode={pragmas['journal_mode']}, "
+                f"busy_timeout={pragmas['busy_timeout']}"
+            )
+        self.stdout.write(
+            f"комментариев: {self.counts['write'] / duration:.1f} в секунду, "
+            f"ошибок записи: {self.counts['write_error']}"
+        )
+        self.stdout.write(
+            f"страниц: {self.counts['read'] / duration:.1f} в секунду, "
+            f"ошибок чтения: {self.counts['read_error']}"
+        )
+
+    def record(self, name, request, expected_status):
+        try:
+            ok = request().status_code == expected_status
+        except Exception:
+            # Тестовый клиент пробрасывает исключения представлений,
+            # например OperationalError «database is locked».
+            ok = False
+        with self.lock:
+            self.counts[name if ok else f"{name}_error"] += 1
+
+    def write(self, client, posts, deadline):
+        try:
+            while time.monotonic() < deadline:
+                url = reverse("posts:add_comment", args=[random.choice(posts)])
+                self.record(
+                    "write",
+                    lambda: client.post(url, {"text": "Комментарий"}),
+                    302,
+                )
+        finally:
+            connection.close()
+
+    def read(self, posts, deadline):
+        client = Client()
+        try:
+            while time.monotonic() < deadline:
+                url = reverse("posts:post_detail", args=[random.choice(posts)])
+                self.record("read", lambda: client.get(url), 200)
+        finally:
+            connection.close()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок с нуля."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Пересобрать ленты только этих пользователей.",
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options["usernames"]:
+            users = User.objects.filter(username__in=options["usernames"])
+        rebuilt = feed.rebuild(users)
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересобрано лент: {rebuilt}")
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = "Пересоздаёт поисковый индекс постов с нуля."
+
+    def handle(self, *args, **options):
+        indexed = search.reindex()
+        self.stdout.write(
+            self.style.SUCCESS(f"Проиндексировано постов: {indexed}")
+        )
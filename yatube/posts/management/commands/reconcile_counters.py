@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики постов и подписок."
+
+    def handle(self, *args, **options):
+        repaired = counters.reconcile()
+        self.stdout.write(
+            self.style.SUCCESS(f"Исправлено строк: {repaired}")
+        )
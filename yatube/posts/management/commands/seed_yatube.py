@@ -0,0 +1,109 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Быстро создаёт синтетические данные через bulk_create: "
+        "пользователей, группы, посты (по желанию с картинками), "
+        "комментарии и подписки. С одним --random-seed данные одинаковые."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in (
+            ("users", 1000),
+            ("groups", 20),
+            ("posts", 20000),
+            ("comments", 50000),
+            ("follows", 10000),
+        ):
+            parser.add_argument(
+                f"--{name}",
+                type=int,
+                default=default,
+                help=f"Сколько создать (по умолчанию {default}).",
+            )
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=0,
+            help="Сколько разных картинок сгенерировать (по умолчанию 0, "
+            "без картинок).",
+        )
+        parser.add_argument(
+            "--image-share",
+            type=float,
+            default=0.3,
+            help="Доля постов с картинкой (по умолчанию 0.3).",
+        )
+        parser.add_argument(
+            "--exponent",
+            type=float,
+            default=1.0,
+            help="Показатель закона Ципфа для авторов постов и подписок "
+            "(по умолчанию 1.0, 0 — равномерно).",
+        )
+        parser.add_argument(
+            "--random-seed",
+            type=int,
+            default=0,
+            help="Зерно генератора (по умолчанию 0).",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="За сколько дней раскидать даты (по умолчанию 365).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Строк в одной транзакции (по умолчанию FEED_BATCH_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        self.reported = {}
+        self.pending = None
+        started = time.perf_counter()
+        created = seeding.seed(
+            users=options["users"],
+            groups=options["groups"],
+            posts=options["posts"],
+            comments=options["comments"],
+            follows=options["follows"],
+            images=options["images"],
+            image_share=options["image_share"],
+            exponent=options["exponent"],
+            random_seed=options["random_seed"],
+            days=options["days"],
+            batch_size=options["batch_size"],
+            progress=self.progress,
+        )
+        if self.pending:
+            self.report(*self.pending)
+        counts = ", ".join(
+            f"{name} {count}" for name, count in created.items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.perf_counter() - started:.1f} с, в базе: "
+            f"{counts}"
+        ))
+
+    def progress(self, name, rows, seconds):
+        # Не чаще раза в секунду на этап, но итог этапа показываем всегда.
+        if self.pending and self.pending[0] != name:
+            self.report(*self.pending)
+        self.pending = (name, rows, seconds)
+        if seconds - self.reported.get(name, -1) >= 1:
+            self.report(name, rows, seconds)
+
+    def report(self, name, rows, seconds):
+        self.reported[name] = seconds
+        self.pending = None
+        rate = rows / seconds if seconds else 0
+        self.stdout.write(
+            f"{name}: {rows} строк за {seconds:.1f} с, {rate:.0f} строк/с"
+        )
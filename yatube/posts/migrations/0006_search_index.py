@@ -0,0 +1,79 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:10
+
+from django.db import migrations
+
+TABLE = 'posts_search'
+
+SCHEMA = {
+    'sqlite': (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+        'text, group_title, author_name, '
+        "tokenize = 'unicode61 remove_diacritics 2')",
+    ),
+    'postgresql': (
+        f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+        'post_id integer PRIMARY KEY '
+        'REFERENCES posts_post (id) ON DELETE CASCADE DEFERRABLE '
+        'INITIALLY DEFERRED, '
+        'document tsvector NOT NULL)',
+        f'CREATE INDEX IF NOT EXISTS {TABLE}_document_idx '
+        f'ON {TABLE} USING GIN (document)',
+    ),
+}
+
+POSTGRESQL_DOCUMENT = (
+    "setweight(to_tsvector('russian', %s), 'A') || "
+    "setweight(to_tsvector('russian', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'B')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor not in SCHEMA:
+        return
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.using(connection.alias).select_related(
+        'author', 'group'
+    )
+    with connection.cursor() as cursor:
+        for statement in SCHEMA[connection.vendor]:
+            cursor.execute(statement)
+        for post in posts.iterator():
+            author = post.author
+            name = ' '.join(filter(None, [
+                author.username,
+                f'{author.first_name} {author.last_name}'.strip(),
+            ]))
+            group_title = post.group.title if post.group_id else ''
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    f'INSERT INTO {TABLE} '
+                    '(rowid, text, group_title, author_name) '
+                    'VALUES (%s, %s, %s, %s)',
+                    [post.pk, post.text, group_title, name],
+                )
+            else:
+                cursor.execute(
+                    f'INSERT INTO {TABLE} (post_id, document) '
+                    f'VALUES (%s, {POSTGRESQL_DOCUMENT})',
+                    [post.pk, post.text, group_title, name],
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor in SCHEMA:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
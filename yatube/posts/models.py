@@ -1,9 +1,31 @@
+import json
+
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import models
 
 User = get_user_model()
 
 
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="stats",
+        verbose_name="Пользователь",
+    )
+    posts_count = models.PositiveIntegerField("Число постов", default=0)
+    followers_count = models.PositiveIntegerField(
+        "Число подписчиков", default=0
+    )
+    following_count = models.PositiveIntegerField("Число подписок", default=0)
+
+    def __str__(self):
+        return str(self.user)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -34,14 +56,70 @@ class Post(models.Model):
     image = models.ImageField(
         "Картинка", upload_to="posts/", blank=True, null=True
     )
+    comments_count = models.PositiveIntegerField(
+        "Число комментариев", default=0, editable=False
+    )
+    thumbnails = models.TextField(
+        "Миниатюры", blank=True, default="", editable=False
+    )
+
+    # Поля, которые обновляются в обход save(): счётчик через F(),
+    # миниатюры из фонового воркера.
+    DERIVED_FIELDS = ("comments_count", "thumbnails")
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Не затираем производные поля устаревшими значениями
+        # при обычном сохранении.
+        if not self._state.adding and not kwargs.get("force_insert"):
+            kwargs.setdefault("update_fields", [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DERIVED_FIELDS
+            ])
+        super().save(*args, **kwargs)
+
+    @property
+    def thumbnail_names(self):
+        return json.loads(self.thumbnails) if self.thumbnails else {}
+
+    def image_variants(self, image_format):
+        """Готовые варианты картинки: [(ширина, высота, адрес)] по ширине."""
+        variants = []
+        for geometry, name in self.thumbnail_names.get(
+            image_format, {}
+        ).items():
+            width, height = map(int, geometry.split("x"))
+            variants.append((width, height, default_storage.url(name)))
+        return sorted(variants)
+
+    @property
+    def thumbnail_url(self):
+        """Адрес самого большого JPEG-варианта.
+
+        Пока воркер его не подготовил, пусто: оригинал может ещё нести
+        метаданные.
+        """
+        variants = self.image_variants("jpeg")
+        return variants[-1][2] if variants else ""
+
     class Meta:
         ordering = [
             "-pub_date",
         ]
+        indexes = [
+            models.Index(fields=["-pub_date"], name="post_pub_date_idx"),
+            models.Index(
+                fields=["author", "-pub_date"],
+                name="post_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=["group", "-pub_date"],
+                name="post_group_pub_date_idx",
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -70,6 +148,12 @@ class Comment(models.Model):
         ordering = [
             "-pub_date",
         ]
+        indexes = [
+            models.Index(
+                fields=["post", "-pub_date"],
+                name="comment_post_pub_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -96,3 +180,57 @@ class Follow(models.Model):
                 name='unique_follower'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["user", "author"],
+                name="follow_user_author_idx",
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Материализованная лента подписок: строка на пару подписчик-пост."""
+
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Подписчик",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Пост",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        ordering = [
+            "-pub_date",
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "post"],
+                name="unique_feed_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["owner", "-pub_date", "-post"],
+                name="feed_owner_pub_date_post_idx",
+            ),
+            models.Index(
+                fields=["owner", "author"],
+                name="feed_owner_author_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} <- {self.post_id}"
@@ -0,0 +1,202 @@
+import binascii
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from core.cache import stats
+
+from . import invalidation
+
+CURSOR_ORDERING = ("-pub_date", "-pk")
+
+
+def encode_cursor(post):
+    raw = f"{post.pub_date.isoformat()}|{post.pk}"
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, pk) или None для битого токена."""
+    try:
+        pub_date, pk = urlsafe_base64_decode(token).decode().split("|")
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class CursorPage:
+    """Страница ленты с переходами только вперёд и назад."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, id) без COUNT(*) и OFFSET.
+
+    Порядок queryset должен совпадать с порядком (-pub_date, -id); если он
+    не задан явно, паджинатор задаёт его сам.
+    """
+
+    def __init__(self, object_list, per_page):
+        if not object_list.query.order_by:
+            object_list = object_list.order_by(*CURSOR_ORDERING)
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def get_page(self, after=None, before=None):
+        after = after and decode_cursor(after)
+        before = before and decode_cursor(before)
+        if before:
+            pub_date, pk = before
+            rows = list(
+                self.object_list.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+                ).reverse()[:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(rows, self, True, has_previous)
+        object_list = self.object_list
+        if after:
+            pub_date, pk = after
+            object_list = object_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        rows = list(object_list[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], self, has_next, bool(after))
+
+
+def _cached_rows(object_list, ids):
+    """Посты страницы из кэша: выборка по первичному ключу в нужном порядке."""
+    rows = {post.pk: post for post in object_list.filter(pk__in=ids)}
+    return [rows[pk] for pk in ids if pk in rows]
+
+
+def _cached_page(key):
+    if not key:
+        return None
+    cached = cache.get(key)
+    stats.record("feed_page", hits=int(bool(cached)), misses=int(not cached))
+    return cached
+
+
+def _filling_list(object_list, key, cached):
+    """Выборка для страницы, которая ляжет в кэш, идёт в основную базу.
+
+    Токен поколения уже сменён записью, а реплика может её ещё не
+    видеть: без этого устаревшая страница жила бы под новым токеном
+    до следующей правки.
+    """
+    if key and not cached:
+        return object_list.using(DEFAULT_DB_ALIAS)
+    return object_list
+
+
+def _cursor_page(request, object_list, per_page, key):
+    cached = _cached_page(key)
+    paginator = CursorPaginator(
+        _filling_list(object_list, key, cached), per_page
+    )
+    if cached:
+        rows = _cached_rows(paginator.object_list, cached["ids"])
+        return CursorPage(
+            rows, paginator, cached["has_next"], cached["has_previous"]
+        )
+    page = paginator.get_page(
+        after=request.GET.get("after"), before=request.GET.get("before")
+    )
+    if key:
+        cache.set(key, {
+            "ids": [post.pk for post in page],
+            "has_next": page.has_next(),
+            "has_previous": page.has_previous(),
+        }, settings.FEED_PAGE_TIMEOUT)
+    return page
+
+
+def _offset_page(request, object_list, per_page, key):
+    cached = _cached_page(key)
+    paginator = Paginator(_filling_list(object_list, key, cached), per_page)
+    if cached:
+        # Заранее заполняем cached_property, чтобы не делать COUNT(*).
+        paginator.count = cached["count"]
+    page = paginator.get_page(request.GET.get("page"))
+    if cached:
+        page.object_list = _cached_rows(object_list, cached["ids"])
+    elif key:
+        cache.set(key, {
+            "ids": [post.pk for post in page],
+            "count": paginator.count,
+        }, settings.FEED_PAGE_TIMEOUT)
+    return page
+
+
+def get_page(request, object_list, view_name, generations=()):
+    """Страница ленты в режиме, выбранном для view в FEED_PAGINATION.
+
+    Если переданы имена поколений, id постов страницы кэшируются, пока
+    сигналы моделей не сменят токен одного из поколений.
+    """
+    per_page = settings.POSTS_PER_PAGE
+    mode = settings.FEED_PAGINATION.get(view_name, "offset")
+    key = None
+    if generations:
+        params = "|".join(
+            request.GET.get(name, "") for name in ("page", "after", "before")
+        )
+        tokens = invalidation.get_tokens(list(generations))
+        digest = hashlib.md5(":".join([*tokens, params]).encode()).hexdigest()
+        key = f"feed_page:{view_name}:{mode}:{digest}"
+    if mode == "cursor":
+        return _cursor_page(request, object_list, per_page, key)
+    return _offset_page(request, object_list, per_page, key)
@@ -0,0 +1,170 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс лежит в отдельной таблице ``posts_search``: в SQLite это
+виртуальная таблица FTS5 (rowid совпадает с id поста), в PostgreSQL —
+tsvector с GIN-индексом. В документ поста входят текст, название группы
+и имя автора. Сигналы моделей переиндексируют посты при сохранении и
+удалении, а также при смене названия группы или имени автора.
+На других СУБД поиск откатывается к ``LIKE`` по тексту.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Post
+
+TABLE = "posts_search"
+SEARCH_CONFIG = "russian"
+
+WORD_RE = re.compile(r"\w+")
+
+SQLITE_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    "text, group_title, author_name, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+)
+POSTGRESQL_SCHEMA = (
+    f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+    "post_id integer PRIMARY KEY "
+    "REFERENCES posts_post (id) ON DELETE CASCADE DEFERRABLE "
+    "INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_document_idx "
+    f"ON {TABLE} USING GIN (document)",
+)
+POSTGRESQL_DOCUMENT = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), 'B') || "
+    f"setweight(to_tsvector('simple', %s), 'B')"
+)
+
+
+def is_supported(using=connection):
+    return using.vendor in ("sqlite", "postgresql")
+
+
+def create_index(using=connection):
+    schema = {
+        "sqlite": SQLITE_SCHEMA,
+        "postgresql": POSTGRESQL_SCHEMA,
+    }.get(using.vendor, ())
+    with using.cursor() as cursor:
+        for statement in schema:
+            cursor.execute(statement)
+
+
+def drop_index(using=connection):
+    if is_supported(using):
+        with using.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def document(post):
+    """Поля документа: текст, название группы, имя автора."""
+    author = post.author
+    return (
+        post.text,
+        post.group.title if post.group_id else "",
+        " ".join(filter(None, [author.username, author.get_full_name()])),
+    )
+
+
+def index_posts(posts):
+    """Добавляет или обновляет посты в индексе."""
+    if not is_supported():
+        return
+    rows = [(post.pk, *document(post)) for post in posts]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.executemany(
+                f"DELETE FROM {TABLE} WHERE rowid = %s",
+                [row[:1] for row in rows],
+            )
+            cursor.executemany(
+                f"INSERT INTO {TABLE} "
+                "(rowid, text, group_title, author_name) "
+                "VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (post_id, document) "
+                f"VALUES (%s, {POSTGRESQL_DOCUMENT}) "
+                "ON CONFLICT (post_id) DO UPDATE "
+                "SET document = EXCLUDED.document",
+                rows,
+            )
+
+
+def remove_post(post_id):
+    if not is_supported():
+        return
+    column = "rowid" if connection.vendor == "sqlite" else "post_id"
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {column} = %s", [post_id])
+
+
+def reindex(posts=None):
+    """Переиндексирует посты пачками; возвращает их число.
+
+    Всё идёт одной транзакцией: пока индекс пересоздаётся, поиск видит
+    старый, а не пустой или недостроенный.
+    """
+    with transaction.atomic():
+        if posts is None:
+            drop_index()
+            create_index()
+            posts = Post.objects.all()
+        posts = posts.select_related("author", "group").order_by("pk")
+        batch = []
+        total = 0
+        for post in posts.iterator(chunk_size=settings.FEED_BATCH_SIZE):
+            batch.append(post)
+            if len(batch) == settings.FEED_BATCH_SIZE:
+                index_posts(batch)
+                total += len(batch)
+                batch = []
+        index_posts(batch)
+    return total + len(batch)
+
+
+def match_expression(query):
+    """Запрос FTS5 из слов пользователя: все слова, каждое как префикс.
+
+    Кавычки экранируют операторы FTS5, а префикс немного заменяет
+    стемминг, которого у unicode61 нет для русского языка.
+    """
+    words = WORD_RE.findall(query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_ids(query, limit=None):
+    """id подходящих постов, от самых релевантных к менее релевантным."""
+    limit = limit or settings.POST_SEARCH_MAX_RESULTS
+    if not WORD_RE.search(query):
+        return []
+    if connection.vendor == "sqlite":
+        sql = (
+            f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s "
+            f"ORDER BY bm25({TABLE}, 4.0, 2.0, 2.0), rowid DESC LIMIT %s"
+        )
+        params = [match_expression(query), limit]
+    elif connection.vendor == "postgresql":
+        sql = (
+            f"SELECT post_id FROM {TABLE}, "
+            f"plainto_tsquery('{SEARCH_CONFIG}', %s) AS query "
+            "WHERE document @@ query "
+            "ORDER BY ts_rank(document, query) DESC, post_id DESC LIMIT %s"
+        )
+        params = [query, limit]
+    else:
+        return list(
+            Post.objects.filter(text__icontains=query)
+            .values_list("pk", flat=True)[:limit]
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
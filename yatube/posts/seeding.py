@@ -0,0 +1,220 @@
+"""Синтетические данные для бенчмарков: пачками через ``bulk_create``.
+
+``bulk_create`` не шлёт сигналы моделей, поэтому счётчики, ленты
+подписок и поисковый индекс пересчитываются один раз в конце.
+Картинки берутся из небольшого набора сгенерированных файлов: пост
+ссылается на один из них, миниатюры каждого файла готовятся один раз.
+"""
+import itertools
+import json
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from core.db import bulk_batch_size
+
+from . import counters, feed, search, thumbnails
+from .models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    "байкал горы море поезд кофе кот собака книга музыка город осень "
+    "зима лето весна дорога лес река друг работа python django код "
+    "фото закат дождь снег поход велосипед театр кино ужин завтрак"
+).split()
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Даёт записать свой ``pub_date`` вместо ``auto_now_add``."""
+    fields = [model._meta.get_field("pub_date") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def zipf_weights(count, exponent=1.0):
+    """Накопленные веса: k-й по популярности выбирается в 1/k^s раз реже."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def insert(model, objects, batch_size, progress=None):
+    """Вставляет строки пачками; возвращает их id по порядку.
+
+    После каждой пачки вызывает ``progress(имя, строк, секунд)``.
+    """
+    last_pk = model.objects.aggregate(last=Max("pk"))["last"] or 0
+    objects = iter(objects)
+    total = 0
+    started = time.perf_counter()
+    while True:
+        batch = list(itertools.islice(objects, batch_size))
+        if not batch:
+            break
+        with transaction.atomic():
+            model.objects.bulk_create(
+                batch, batch_size=bulk_batch_size(model, batch_size)
+            )
+        total += len(batch)
+        if progress is not None:
+            progress(
+                model._meta.model_name,
+                total,
+                time.perf_counter() - started,
+            )
+    new_last = model.objects.aggregate(last=Max("pk"))["last"] or 0
+    if new_last - last_pk == total:
+        # Автоинкремент выдал id подряд: незачем читать их из базы.
+        return range(last_pk + 1, new_last + 1)
+    return list(
+        model.objects.filter(pk__gt=last_pk)
+        .order_by("pk").values_list("pk", flat=True)
+    )
+
+
+def text(rng, low=5, high=30):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def make_images(rng, count, prefix):
+    """Сохраняет ``count`` картинок-градиентов; возвращает их имена."""
+    width = max(settings.POST_IMAGE_WIDTHS)
+    ratio_width, ratio_height = settings.POST_IMAGE_RATIO
+    height = round(width * ratio_height / ratio_width)
+    names = []
+    for number in range(count):
+        start, end = (
+            [rng.randrange(256) for _ in range(3)] for _ in range(2)
+        )
+        image = Image.new("RGB", (width, height))
+        draw = ImageDraw.Draw(image)
+        for x in range(width):
+            draw.line([(x, 0), (x, height)], fill=tuple(
+                a + (b - a) * x // width for a, b in zip(start, end)
+            ))
+        buffer = BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+        names.append(default_storage.save(
+            f"posts/{prefix}-{number}.jpg", ContentFile(buffer.getvalue())
+        ))
+    return names
+
+
+def prepare_thumbnails(names):
+    """Готовит миниатюры каждой картинки один раз на все её посты."""
+    updated = 0
+    for name in names:
+        post = Post.objects.filter(image=name).only("id", "image").first()
+        if post is None:
+            continue
+        image_name, variants = thumbnails.build(post)
+        updated += Post.objects.filter(image=name).update(
+            image=image_name, thumbnails=json.dumps(variants)
+        )
+    return updated
+
+
+def seed(users=1000, groups=20, posts=20000, comments=50000, follows=10000,
+         images=0, image_share=0.3, exponent=1.0, random_seed=0, days=365,
+         batch_size=None, progress=None):
+    """Создаёт данные и пересчитывает производные; возвращает их число.
+
+    Авторы постов и подписок выбираются по закону Ципфа с показателем
+    ``exponent``: немногие пишут и собирают подписчиков больше всех,
+    как в настоящей сети. С ``images`` доля ``image_share`` постов
+    получает одну из стольких сгенерированных картинок.
+    ``progress(имя, строк, секунд)`` вызывается после каждой пачки
+    и после каждого пересчёта.
+    """
+    rng = random.Random(random_seed)
+    batch_size = batch_size or settings.FEED_BATCH_SIZE
+    start = User.objects.aggregate(last=Max("pk"))["last"] or 0
+    user_ids = insert(User, (
+        User(username=f"seed{start + number}", password="!")
+        for number in range(1, users + 1)
+    ), batch_size, progress)
+    group_ids = insert(Group, (
+        Group(
+            title=f"Группа {start + number}",
+            slug=f"seed-{start + number}",
+            description=text(rng),
+        )
+        for number in range(1, groups + 1)
+    ), batch_size, progress)
+    image_names = make_images(rng, images, f"seed-{start}")
+    popular = zipf_weights(len(user_ids), exponent)
+    now = timezone.now()
+    span = timedelta(days=days).total_seconds()
+
+    def dates(count):
+        # По возрастанию: id и дата растут вместе, как при обычной работе.
+        return (
+            now - timedelta(seconds=span * (1 - number / count))
+            for number in range(count)
+        )
+
+    with explicit_dates(Post, Comment):
+        post_ids = insert(Post, (
+            Post(
+                text=text(rng),
+                author_id=rng.choices(user_ids, cum_weights=popular)[0],
+                group_id=rng.choice(group_ids) if group_ids
+                and rng.random() < 0.7 else None,
+                image=rng.choice(image_names) if image_names
+                and rng.random() < image_share else None,
+                pub_date=pub_date,
+            )
+            for pub_date in dates(posts)
+        ), batch_size, progress)
+        insert(Comment, (
+            Comment(
+                post_id=rng.choice(post_ids),
+                author_id=rng.choice(user_ids),
+                text=text(rng, 1, 10),
+                pub_date=pub_date,
+            )
+            for pub_date in dates(comments if post_ids else 0)
+        ), batch_size, progress)
+    # Множество без повторов: все подписчики новые, конфликтов нет.
+    pairs = {
+        (rng.choice(user_ids), rng.choices(user_ids, cum_weights=popular)[0])
+        for _ in range(follows)
+    }
+    insert(Follow, (
+        Follow(user_id=user, author_id=author)
+        for user, author in sorted(pairs) if user != author
+    ), batch_size, progress)
+    for name, rebuild in (
+        ("thumbnails", lambda: prepare_thumbnails(image_names)),
+        ("counters", counters.reconcile),
+        ("feeds", feed.rebuild),
+        ("search", search.reindex),
+    ):
+        started = time.perf_counter()
+        rows = rebuild() or 0
+        if progress is not None:
+            progress(name, rows, time.perf_counter() - started)
+    cache.clear()
+    return {
+        "users": User.objects.count(),
+        "groups": Group.objects.count(),
+        "posts": Post.objects.count(),
+        "comments": Comment.objects.count(),
+        "follows": Follow.objects.count(),
+    }
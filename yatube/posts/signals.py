@@ -0,0 +1,194 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import counters, feed, invalidation, search, thumbnails
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+NAME_FIELDS = ("username", "first_name", "last_name")
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved_state(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._saved_state = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("group_id", "image")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, "posts_count", 1)
+        feed.fan_out_post(instance)
+        invalidation.bump_post(
+            instance, instance.author_id in feed.pull_author_ids()
+        )
+        if instance.image:
+            thumbnails.schedule(instance.pk)
+        return
+    saved_group_id, saved_image = getattr(
+        instance, "_saved_state", None
+    ) or (None, None)
+    if (saved_image or "") != (instance.image.name or ""):
+        Post.objects.filter(pk=instance.pk).update(thumbnails="")
+        if instance.image:
+            thumbnails.schedule(instance.pk)
+    invalidation.bump_post(
+        instance,
+        instance.author_id in feed.pull_author_ids(),
+        [saved_group_id],
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def remember_name(sender, instance, update_fields, **kwargs):
+    instance._saved_name = None
+    # Вход пользователя сохраняет только last_login: имя не менялось.
+    if instance._state.adding or (
+        update_fields and not set(NAME_FIELDS) & set(update_fields)
+    ):
+        return
+    instance._saved_name = (
+        User.objects.filter(pk=instance.pk).values_list(*NAME_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def author_renamed(sender, instance, **kwargs):
+    saved_name = getattr(instance, "_saved_name", None)
+    if saved_name is None or saved_name == tuple(
+        getattr(instance, field) for field in NAME_FIELDS
+    ):
+        return
+    search.reindex(instance.posts.all())
+    invalidation.bump_content()
+
+
+@receiver(pre_save, sender=Group)
+def remember_title(sender, instance, update_fields, **kwargs):
+    instance._saved_title = None
+    if instance._state.adding or (
+        update_fields and not {"title", "slug"} & set(update_fields)
+    ):
+        return
+    instance._saved_title = (
+        Group.objects.filter(pk=instance.pk)
+        .values_list("title", "slug").first()
+    )
+
+
+@receiver(post_save, sender=Group)
+def reindex_group(sender, instance, **kwargs):
+    saved_title = getattr(instance, "_saved_title", None)
+    if saved_title is None:
+        return
+    title, slug = saved_title
+    if title != instance.title:
+        search.reindex(instance.posts.all())
+    # Название и адрес группы видны в карточках её постов во всех лентах.
+    if (title, slug) != (instance.title, instance.slug):
+        invalidation.bump_content()
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    instance._post_ids = list(instance.posts.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def reindex_ungrouped(sender, instance, **kwargs):
+    search.reindex(Post.objects.filter(pk__in=instance._post_ids))
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, "posts_count", -1)
+    invalidation.bump_post(
+        instance, instance.author_id in feed.pull_author_ids()
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    invalidation.bump(
+        invalidation.GROUPS_GENERATION,
+        *invalidation.group_generations(instance.pk),
+    )
+
+
+@receiver(post_delete, sender=Group)
+def ungroup_posts(sender, instance, **kwargs):
+    if instance._post_ids:
+        invalidation.bump_content()
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post(sender, instance, **kwargs):
+    # Число комментариев видно в карточке поста во всех лентах.
+    post = Post.objects.filter(pk=instance.post_id).only(
+        "id", "author_id", "group_id"
+    ).first()
+    if post is not None:
+        invalidation.bump_post(
+            post, post.author_id in feed.pull_author_ids()
+        )
+
+
+def _invalidate_follow(follow):
+    # Счётчики подписок видны в профилях обоих пользователей.
+    invalidation.bump(
+        invalidation.follow_generation(follow.user_id),
+        *invalidation.profile_generations(follow.user_id),
+        *invalidation.profile_generations(follow.author_id),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, "followers_count", 1)
+        counters.bump_user(instance.user_id, "following_count", 1)
+        feed.backfill(instance)
+        feed.followers_changed(instance.author_id, 1)
+        _invalidate_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, "followers_count", -1)
+    counters.bump_user(instance.user_id, "following_count", -1)
+    feed.prune(instance)
+    feed.followers_changed(instance.author_id, -1)
+    _invalidate_follow(instance)
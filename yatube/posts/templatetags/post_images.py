@@ -0,0 +1,40 @@
+from django import template
+from django.conf import settings
+
+from ..thumbnails import image_formats
+
+register = template.Library()
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+
+def _srcset(variants):
+    return ", ".join(f"{url} {width}w" for width, height, url in variants)
+
+
+@register.inclusion_tag("posts/includes/post_image.html")
+def post_image(post, css_class="card-img"):
+    """Картинка поста с srcset по ширинам и source для WebP/AVIF."""
+    context = {"css_class": css_class, "src": post.thumbnail_url}
+    fallback = post.image_variants("jpeg")
+    if not fallback:
+        return context
+    width, height, src = fallback[-1]
+    # Сначала более сжатые форматы: браузер берёт первый знакомый.
+    sources = []
+    for image_format in reversed(image_formats()[1:]):
+        variants = post.image_variants(image_format)
+        if variants:
+            sources.append({
+                "type": MIME_TYPES.get(image_format, f"image/{image_format}"),
+                "srcset": _srcset(variants),
+            })
+    context.update({
+        "src": src,
+        "srcset": _srcset(fallback),
+        "sizes": settings.POST_IMAGE_SIZES,
+        "sources": sources,
+        "width": width,
+        "height": height,
+    })
+    return context
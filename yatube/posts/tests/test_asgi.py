@@ -0,0 +1,31 @@
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from yatube.asgi import application
+
+
+class AsgiTests(SimpleTestCase):
+    @async_to_sync
+    async def request(self, path):
+        communicator = ApplicationCommunicator(application, {
+            "type": "http",
+            "http_version": "1.1",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [(b"host", b"testserver")],
+        })
+        await communicator.send_input({"type": "http.request"})
+        start = await communicator.receive_output(5)
+        body = await communicator.receive_output(5)
+        return start, body
+
+    def test_page_served(self):
+        """ASGI-приложение отдаёт страницу и cookie без пробелов."""
+        start, body = self.request(reverse("users:login"))
+        self.assertEqual(start["status"], 200)
+        headers = {name.lower(): value for name, value in start["headers"]}
+        self.assertTrue(headers[b"set-cookie"].startswith(b"csrftoken="))
+        self.assertIn("Войти".encode(), body["body"])
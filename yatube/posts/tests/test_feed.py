@@ -0,0 +1,122 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..feed import get_feed, rebuild
+from ..models import FeedEntry, Follow, Post, User
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(
+            "Pasha", "pasha2009@mail.ru", "123456789"
+        )
+        cls.author = User.objects.create_user(
+            "Bogdan", "bboybaga13@mail.ru", "12345678"
+        )
+        cls.old_post = Post.objects.create(text="Старый", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follow_backfills_feed(self):
+        """Подписка докладывает в ленту уже написанные посты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(list(get_feed(self.reader)), [self.old_post])
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков сразу."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text="Новый", author=self.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(owner=self.reader, post=post).exists()
+        )
+        self.assertEqual(get_feed(self.reader)[0], post)
+
+    def test_unfollow_prunes_feed(self):
+        """Отписка убирает посты автора из ленты."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(owner=self.reader).exists())
+        self.assertEqual(len(get_feed(self.reader)), 0)
+
+    def test_fan_out_to_many_followers(self):
+        """Раздача проходит пачками больше предела SQLite в 500 строк."""
+        User.objects.bulk_create(
+            User(username=f"reader{number}") for number in range(600)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=self.author)
+            for user in User.objects.filter(username__startswith="reader")
+        )
+        post = Post.objects.create(text="Новый", author=self.author)
+        self.assertEqual(FeedEntry.objects.filter(post=post).count(), 600)
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_on_the_fly(self):
+        """Посты популярного автора не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.clear()
+        post = Post.objects.create(text="Новый", author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(
+            list(get_feed(self.reader)), [post, self.old_post]
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_author_back_to_fan_out_refills_feeds(self):
+        """После отписки ниже предела посты автора снова в лентах."""
+        other = User.objects.create_user("Sasha")
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text="Новый", author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        follow.delete()
+        self.assertEqual(
+            list(get_feed(self.reader)), [post, self.old_post]
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(owner=self.reader).count(), 2
+        )
+
+    def test_rebuild_feeds_command(self):
+        """Команда rebuild_feeds восстанавливает потерянные записи."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command("rebuild_feeds", stdout=StringIO())
+        self.assertEqual(list(get_feed(self.reader)), [self.old_post])
+
+    def test_rebuild_unknown_users(self):
+        """Пересборка лент неизвестных пользователей ничего не трогает."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        out = StringIO()
+        call_command("rebuild_feeds", "nobody", stdout=out)
+        self.assertIn("Пересобрано лент: 0", out.getvalue())
+        self.assertEqual(list(get_feed(self.reader)), [self.old_post])
+
+    @override_settings(FEED_BACKFILL_LIMIT=2)
+    def test_rebuild_matches_backfill(self):
+        """Пересборка одним запросом даёт те же записи, что и подписка."""
+        other = User.objects.create_user("Other")
+        for number in range(3):
+            Post.objects.create(text=f"Пост {number}", author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+
+        def entries():
+            return set(FeedEntry.objects.values_list("owner_id", "post_id"))
+
+        expected = entries()
+        self.assertEqual(len(expected), 4)
+        FeedEntry.objects.all().delete()
+        self.assertEqual(rebuild(), 2)
+        self.assertEqual(entries(), expected)
+        FeedEntry.objects.all().delete()
+        self.assertEqual(rebuild(User.objects.filter(pk=other.pk)), 1)
+        self.assertEqual(
+            entries(), {entry for entry in expected if entry[0] == other.pk}
+        )
@@ -1,16 +1,25 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
-from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image, ImageFile
 from posts.models import Comment, Group, Post, User
+from posts.thumbnails import strip_upload
+from posts.uploads import bounded_uploads
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_EXECUTOR="sync")
 class NewPostCreateTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -131,6 +140,118 @@ class NewPostCreateTests(TestCase):
         self.assertEqual(NewPostCreateTests.post.text, form_data["text"])
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_EXECUTOR="sync")
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            "Bogdanchik", "bboybaga14@mail.ru", "12345678"
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ImageUploadTests.user)
+
+    def post_image(self, size):
+        buffer = BytesIO()
+        Image.new("RGB", size).save(buffer, "PNG")
+        uploaded = SimpleUploadedFile(
+            name="big.png", content=buffer.getvalue(), content_type="image/png"
+        )
+        return self.authorized_client.post(
+            reverse("posts:new_post"),
+            data={"text": "Картинка", "image": uploaded},
+        )
+
+    @override_settings(POST_IMAGE_MAX_BYTES=100)
+    def test_too_many_bytes(self):
+        """Файл больше лимита отклоняется с ошибкой формы."""
+        response = self.post_image((500, 500))
+        self.assertFormError(
+            response, "form", "image", "Файл больше 100\xa0байт."
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100 * 100)
+    def test_too_many_pixels(self):
+        """Размеры проверяются по заголовку, до декодирования."""
+        response = self.post_image((200, 100))
+        self.assertFormError(
+            response,
+            "form",
+            "image",
+            "Картинка слишком большая: 200×100 пикселей.",
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_metadata_is_stripped_on_upload(self):
+        """JPEG сохраняется без EXIF ещё до фоновой обработки.
+
+        Остаётся только поворот, пиксели в запросе не декодируются.
+        """
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = "Phone"
+        buffer = BytesIO()
+        Image.new("RGB", (120, 60)).save(
+            buffer, "JPEG", exif=exif, comment=b"GPS"
+        )
+        with mock.patch.object(
+            ImageFile.ImageFile, "load", side_effect=AssertionError
+        ):
+            self.authorized_client.post(reverse("posts:new_post"), data={
+                "text": "Картинка",
+                "image": SimpleUploadedFile("phone.jpg", buffer.getvalue()),
+            })
+        post = Post.objects.get()
+        self.assertEqual(post.thumbnail_names, {})
+        with default_storage.open(post.image.name) as original:
+            image = Image.open(original)
+            self.assertEqual(dict(image.getexif()), {0x0112: 6})
+            self.assertNotIn("comment", image.info)
+            self.assertEqual(image.size, (120, 60))
+            image.load()
+
+    def test_upload_without_metadata_is_kept(self):
+        """Картинка без метаданных сохраняется как есть."""
+        buffer = BytesIO()
+        Image.new("RGB", (120, 60)).save(buffer, "JPEG")
+        upload = SimpleUploadedFile("plain.jpg", buffer.getvalue())
+        with mock.patch.object(
+            ImageFile.ImageFile, "load", side_effect=AssertionError
+        ):
+            self.assertIs(strip_upload(upload), upload)
+
+    def test_upload_goes_to_temporary_file(self):
+        """Картинка поста не буферизуется в памяти, остальные загрузки — как
+        в Django."""
+        buffer = BytesIO()
+        Image.new("RGB", (10, 10)).save(buffer, "PNG")
+        files = []
+
+        def view(request):
+            files.append(request.FILES["image"])
+            return HttpResponse()
+
+        for handle in (bounded_uploads(view), view):
+            request = RequestFactory().post("/", {
+                "image": SimpleUploadedFile("small.png", buffer.getvalue())
+            })
+            request._dont_enforce_csrf_checks = True
+            handle(request)
+        self.assertIsInstance(files[0], TemporaryUploadedFile)
+        self.assertIsInstance(files[1], InMemoryUploadedFile)
+
+    def test_csrf_is_checked(self):
+        """Смена обработчиков загрузки не отключает проверку CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(ImageUploadTests.user)
+        response = client.post(reverse("posts:new_post"), {"text": "Текст"})
+        self.assertTemplateUsed(response, "core/403csrf.html")
+        self.assertFalse(Post.objects.exists())
+
+
 class NewCommentTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -0,0 +1,58 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from ..feed import get_feed
+from ..models import Comment, Follow, Group, Post, User
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN из SQLite")
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            "Pasha", "pasha2009@mail.ru", "123456789"
+        )
+        cls.author = User.objects.create_user(
+            "Bogdan", "bboybaga13@mail.ru", "12345678"
+        )
+        cls.group = Group.objects.create(
+            title="Test_title",
+            slug="group1",
+            description="ahahahahhaa, this is test...",
+        )
+        cls.post = Post.objects.create(
+            text="Текст", author=cls.author, group=cls.group
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset):
+        plan = self.explain(queryset)
+        for step in plan:
+            self.assertNotIn("TEMP B-TREE", step, plan)
+            if step.startswith("SCAN"):
+                self.assertIn("INDEX", step, plan)
+
+    def test_feed_queries_use_indexes(self):
+        """Основные запросы лент читают индекс без сортировки."""
+        querysets = {
+            "index": Post.objects.all()[:10],
+            "group_posts": self.group.posts.all()[:10],
+            "profile": self.author.posts.all()[:10],
+            "follow_index": get_feed(self.user)[:10],
+            "comments": Comment.objects.filter(post=self.post),
+            "following": Follow.objects.filter(
+                user=self.user, author=self.author
+            ),
+        }
+        for name, queryset in querysets.items():
+            with self.subTest(query=name):
+                self.assertUsesIndex(queryset)
@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+from posts import invalidation
+from posts.models import Follow, Post, User
+
+
+class InvalidationTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author")
+        self.reader = User.objects.create_user("reader")
+
+    def test_tokens_change_after_commit(self):
+        """Поколения меняются только после коммита."""
+        names = invalidation.index_generations() + [
+            invalidation.follow_generation(self.reader.pk)
+        ]
+        tokens = invalidation.get_tokens(names)
+        with transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
+            post = Post.objects.create(text="Пост", author=self.author)
+            post.text = "Правка"
+            post.save()
+            self.assertEqual(invalidation.get_tokens(names), tokens)
+        new_tokens = invalidation.get_tokens(names)
+        self.assertNotEqual(new_tokens[0], tokens[0])
+        self.assertNotEqual(new_tokens[1], tokens[1])
+        self.assertGreater(
+            invalidation.token_time(new_tokens[0]),
+            invalidation.token_time(tokens[0]),
+        )
+
+    def test_rollback_keeps_tokens(self):
+        """Откаченная транзакция не сбрасывает кэш."""
+        names = invalidation.index_generations()
+        tokens = invalidation.get_tokens(names)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Post.objects.create(text="Пост", author=self.author)
+            raise RuntimeError
+        self.assertEqual(invalidation.get_tokens(names), tokens)
@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import Client, TestCase
 
-from ..models import Follow, Group, Post, User
+from ..models import Comment, Follow, Group, Post, User, UserStats
 
 
 class PostModelTest(TestCase):
@@ -60,3 +63,86 @@ class UniqueFollowTests(TestCase):
         )
         self.first_authorized_client = Client()
         self.first_authorized_client.force_login(self.first_user)
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(
+            "Pasha", "pasha2009@mail.ru", "123456789"
+        )
+        cls.author = User.objects.create_user(
+            "Bogdan", "bboybaga13@mail.ru", "12345678"
+        )
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        """Счётчики постов и комментариев следуют за созданием и удалением."""
+        post = Post.objects.create(text="Текст", author=self.author)
+        Post.objects.create(text="Текст", author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text="Коммент"
+        )
+        post.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_stale_post_save_keeps_comments_count(self):
+        """Сохранение устаревшего поста не затирает счётчик комментариев."""
+        post = Post.objects.create(text="Текст", author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text="Коммент")
+        post.text = "Новый текст"
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_follow_counters(self):
+        """Счётчики подписчиков и подписок."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters чинит разъехавшиеся счётчики."""
+        post = Post.objects.create(text="Текст", author=self.author)
+        other_post = Post.objects.create(text="Текст", author=self.author)
+        for text in ("Раз", "Два"):
+            Comment.objects.create(post=post, author=self.reader, text=text)
+        Follow.objects.create(user=self.reader, author=self.author)
+        bystander = User.objects.create_user("Vasya")
+        UserStats.objects.filter(user=self.author).update(
+            posts_count=42, followers_count=7
+        )
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        UserStats.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        # Статистика автора, заново созданная статистика читателя и пост.
+        self.assertEqual(out.getvalue(), "Исправлено строк: 3\n")
+        post.refresh_from_db()
+        other_post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(other_post.comments_count, 0)
+        author_stats = self.stats(self.author)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(author_stats.following_count, 0)
+        reader_stats = self.stats(self.reader)
+        self.assertEqual(reader_stats.posts_count, 0)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(self.stats(bystander).followers_count, 0)
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertEqual(out.getvalue(), "Исправлено строк: 0\n")
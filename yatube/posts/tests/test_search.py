@@ -0,0 +1,157 @@
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post, User
+from ..search import search_ids
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            "Bogdan", "bboybaga13@mail.ru", "12345678",
+            first_name="Богдан", last_name="Петров",
+        )
+        cls.group = Group.objects.create(
+            title="Путешествия", slug="travel", description="Поездки"
+        )
+
+    def test_text_group_and_author(self):
+        """Пост находится по тексту, названию группы и имени автора."""
+        post = Post.objects.create(
+            text="Поездка на Байкал", author=self.user, group=self.group
+        )
+        self.assertEqual(search_ids("байкал"), [post.pk])
+        self.assertEqual(search_ids("путешествия"), [post.pk])
+        self.assertEqual(search_ids("Петров"), [post.pk])
+        self.assertEqual(search_ids("Bogdan"), [post.pk])
+        self.assertEqual(search_ids("Эльбрус"), [])
+
+    def test_ranking(self):
+        """Пост, где слово встречается чаще, стоит выше."""
+        rare = Post.objects.create(
+            text="Кот и много других слов про собак и погоду",
+            author=self.user,
+        )
+        often = Post.objects.create(text="Кот кот кот", author=self.user)
+        self.assertEqual(search_ids("кот"), [often.pk, rare.pk])
+
+    def test_prefix_and_operators(self):
+        """Слова ищутся как префиксы, операторы FTS5 не ломают запрос."""
+        post = Post.objects.create(text="Котики спят", author=self.user)
+        self.assertEqual(search_ids("кот"), [post.pk])
+        self.assertEqual(search_ids('кот"* ('), [post.pk])
+        self.assertEqual(search_ids('"*'), [])
+
+    def test_incremental_updates(self):
+        """Индекс следует за правкой и удалением поста."""
+        post = Post.objects.create(text="Старый текст", author=self.user)
+        post.text = "Новый текст"
+        post.save()
+        self.assertEqual(search_ids("старый"), [])
+        self.assertEqual(search_ids("новый"), [post.pk])
+        post.delete()
+        self.assertEqual(search_ids("новый"), [])
+
+    def test_group_and_author_renames(self):
+        """Смена названия группы и имени автора переиндексирует посты."""
+        group = Group.objects.create(
+            title="Горы", slug="mountains", description="Горы"
+        )
+        user = User.objects.create_user("Ivan", last_name="Иванов")
+        post = Post.objects.create(text="Текст", author=user, group=group)
+        group.title = "Походы"
+        group.save()
+        user.last_name = "Сидоров"
+        user.save()
+        self.assertEqual(search_ids("походы"), [post.pk])
+        self.assertEqual(search_ids("горы"), [])
+        self.assertEqual(search_ids("сидоров"), [post.pk])
+        group.delete()
+        self.assertEqual(search_ids("походы"), [])
+
+    def test_user_save_without_rename(self):
+        """Сохранение пользователя без смены имени не трогает индекс."""
+        self.user.set_password("87654321")
+        with mock.patch.object(search, "reindex") as reindex:
+            self.user.save()
+            self.user.save(update_fields=["first_name"])
+        reindex.assert_not_called()
+
+    def test_group_save_without_rename(self):
+        """Сохранение группы без смены названия не трогает индекс."""
+        self.group.description = "Поездки по России"
+        with mock.patch.object(search, "reindex") as reindex:
+            self.group.save()
+            self.group.save(update_fields=["description"])
+        reindex.assert_not_called()
+
+    def test_rebuild_command(self):
+        """Команда пересоздаёт индекс с нуля."""
+        post = Post.objects.create(text="Байкал", author=self.user)
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Проиндексировано постов: 1", out.getvalue())
+        self.assertEqual(search_ids("байкал"), [post.pk])
+
+    def test_failed_rebuild_keeps_index(self):
+        """Упавшая перестройка оставляет прежний индекс целиком."""
+        post = Post.objects.create(text="Байкал", author=self.user)
+        with mock.patch.object(
+            search, "index_posts", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            search.reindex()
+        self.assertEqual(search_ids("байкал"), [post.pk])
+
+    def test_benchmark_command(self):
+        """Бенчмарк сравнивает индекс с LIKE."""
+        Post.objects.create(text="Байкал", author=self.user)
+        out = StringIO()
+        call_command("benchmark_search", "байкал", "--repeat", "1", stdout=out)
+        self.assertIn("LIKE", out.getvalue())
+
+
+@override_settings(POSTS_PER_PAGE=2)
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            "Bogdan", "bboybaga13@mail.ru", "12345678"
+        )
+        for number in range(3):
+            Post.objects.create(text=f"Байкал {number}", author=cls.user)
+
+    def test_results_are_paginated(self):
+        """Результаты разбиты на страницы, запрос сохраняется в ссылках."""
+        client = Client()
+        response = client.get(reverse("posts:search"), {"q": "байкал"})
+        self.assertEqual(response.context["page_obj"].paginator.count, 3)
+        self.assertEqual(len(response.context["page_obj"]), 2)
+        query = urlencode({"q": "байкал"})
+        self.assertContains(response, f"?{query}&amp;page=2")
+        response = client.get(
+            reverse("posts:search"), {"q": "байкал", "page": 2}
+        )
+        self.assertEqual(len(response.context["page_obj"]), 1)
+
+    def test_empty_query(self):
+        """Без запроса страница показывает только форму."""
+        response = Client().get(reverse("posts:search"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["page_obj"]), 0)
+
+    @override_settings(DEBUG=True)
+    def test_post_with_debug_toolbar(self):
+        """Новый пост индексируется и при включённом debug_toolbar."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(reverse("posts:new_post"), {"text": "Ольхон"})
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get(text="Ольхон")
+        self.assertEqual(search_ids("ольхон"), [post.pk])
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, FeedEntry, Post, User
+from ..seeding import seed
+from ..search import search_ids
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class SeedingTests(TestCase):
+    def test_seed(self):
+        """Данные создаются вместе со счётчиками, лентами и индексом."""
+        created = seed(users=10, groups=2, posts=50, comments=30, follows=20)
+        self.assertEqual(created["users"], 10)
+        self.assertEqual(created["posts"], 50)
+        self.assertEqual(created["comments"], 30)
+        post = Post.objects.order_by("?").first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        self.assertIn(post.pk, search_ids(post.text.split()[0]))
+        self.assertTrue(FeedEntry.objects.exists())
+
+    def test_seed_is_deterministic(self):
+        """Одно зерно даёт одни и те же тексты."""
+        seed(users=5, groups=1, posts=10, comments=0, follows=0)
+        first = list(
+            Post.objects.order_by("pk").values_list("text", flat=True)
+        )
+        Post.objects.all().delete()
+        seed(users=5, groups=1, posts=10, comments=0, follows=0)
+        second = list(
+            Post.objects.order_by("pk").values_list("text", flat=True)
+        )[-10:]
+        self.assertEqual(first, second)
+
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_EXECUTOR="sync")
+    def test_seed_command_with_images(self):
+        """Команда показывает скорость этапов и готовит миниатюры."""
+        out = StringIO()
+        try:
+            call_command(
+                "seed_yatube", "--users", "5", "--posts", "20",
+                "--comments", "5", "--follows", "5", "--images", "2",
+                "--image-share", "1", stdout=out,
+            )
+            post = Post.objects.first()
+            self.assertTrue(default_storage.exists(post.image.name))
+            self.assertIn("jpeg", post.thumbnail_names)
+        finally:
+            shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.assertFalse(Post.objects.filter(thumbnails="").exists())
+        for stage in ("post:", "comment:", "follow:", "feeds:"):
+            self.assertIn(stage, out.getvalue())
+        self.assertIn("строк/с", out.getvalue())
+
+    def test_benchmark_urls(self):
+        """Бенчмарк обходит все адреса и пишет их в JSON."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.json")
+            call_command(
+                "benchmark_urls", "--seed", "--users", "5", "--posts", "20",
+                "--comments", "10", "--follows", "10", "--requests", "2",
+                "--warmup", "0", "--json", path, stdout=StringIO(),
+            )
+            out = StringIO()
+            call_command(
+                "benchmark_urls", "--requests", "1", "--warmup", "0",
+                "--compare", path, stdout=out,
+            )
+            with open(path) as file:
+                report = json.load(file)
+        routes = report["routes"]
+        self.assertIn("posts:index", routes)
+        self.assertIn("about:author", routes)
+        self.assertEqual(routes["posts:profile_unfollow"]["status"], 302)
+        self.assertEqual(routes["posts:add_comment"]["status"], 302)
+        self.assertEqual(report["dataset"]["users"], User.objects.count())
+        self.assertGreater(Comment.objects.count(), 10)
+        self.assertIn("Сравнение с прошлым прогоном", out.getvalue())
@@ -0,0 +1,180 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .. import invalidation
+from ..models import Post, User
+from ..thumbnails import generate, image_formats
+from .utils import commit_callbacks
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name, size=(1200, 600)):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, "JPEG")
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type="image/jpeg"
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_EXECUTOR="sync")
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            "Bogdan", "bboybaga13@mail.ru", "12345678"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate_records_thumbnail(self):
+        """Воркер сохраняет варианты, шаблон берёт самый большой JPEG."""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=make_image("big.jpg")
+        )
+        # Оригинал не показывается, пока воркер его не почистил.
+        self.assertEqual(post.thumbnail_url, "")
+
+        names = invalidation.post_generations(post.pk)
+        tokens = invalidation.get_tokens(names)
+        with commit_callbacks():
+            generate(post.pk)
+        # Страницы поста перестают отдавать 304 без картинки.
+        self.assertNotEqual(invalidation.get_tokens(names), tokens)
+        post.refresh_from_db()
+        variants = post.thumbnail_names["jpeg"]
+        self.assertEqual(
+            list(variants), ["480x170", "720x254", "960x339"]
+        )
+        name = variants["960x339"]
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(post.thumbnail_url, default_storage.url(name))
+        with default_storage.open(name) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (960, 339))
+
+    def test_modern_formats(self):
+        """Для каждой ширины есть варианты в форматах, которые умеет Pillow."""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=make_image("big.jpg")
+        )
+        generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(set(post.thumbnail_names), set(image_formats()))
+        self.assertIn("webp", post.thumbnail_names)
+        with default_storage.open(
+            post.thumbnail_names["webp"]["480x170"]
+        ) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).format, "WEBP")
+
+    def test_small_image_is_not_upscaled(self):
+        """Ширины больше исходной картинки не создаются."""
+        post = Post.objects.create(
+            text="Текст",
+            author=self.user,
+            image=make_image("small.jpg", size=(600, 400)),
+        )
+        generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(list(post.thumbnail_names["jpeg"]), ["480x170"])
+
+    def test_post_image_tag(self):
+        """Тег выводит srcset, sizes и размеры, чтобы не прыгала вёрстка."""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=make_image("big.jpg")
+        )
+        template = Template("{% load post_images %}{% post_image post %}")
+        html = template.render(Context({"post": post}))
+        self.assertNotIn("<img", html)
+
+        generate(post.pk)
+        post.refresh_from_db()
+        html = template.render(Context({"post": post}))
+        webp = post.image_variants("webp")
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn(f"{webp[0][2]} 480w", html)
+        self.assertIn(f'sizes="{settings.POST_IMAGE_SIZES}"', html)
+        self.assertIn('width="960" height="339"', html)
+
+    def test_benchmark_images(self):
+        """Бенчмарк показывает экономию байт на странице ленты."""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=make_image("big.jpg")
+        )
+        generate(post.pk)
+        out = StringIO()
+        call_command("benchmark_images", "--viewport", "320", stdout=out)
+        self.assertIn("Постов с картинками: 1", out.getvalue())
+        self.assertIn("webp:", out.getvalue())
+
+    def test_stale_save_keeps_thumbnails(self):
+        """Сохранение поста без новой картинки не теряет миниатюры."""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=make_image("big.jpg")
+        )
+        generate(post.pk)
+        post.text = "Новый текст"
+        post.save()
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_names)
+
+    def test_new_image_resets_thumbnails(self):
+        """Замена картинки сбрасывает миниатюры старой."""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=make_image("big.jpg")
+        )
+        generate(post.pk)
+        post.image = make_image("other.jpg")
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_names, {})
+
+    def test_metadata_is_stripped(self):
+        """Оригинал перезаписывается без EXIF и с учётом поворота."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = "Phone"
+        buffer = BytesIO()
+        Image.new("RGB", (1200, 600)).save(buffer, "JPEG", exif=exif)
+        post = Post.objects.create(
+            text="Текст",
+            author=self.user,
+            image=SimpleUploadedFile("phone.jpg", buffer.getvalue()),
+        )
+        generate(post.pk)
+        post.refresh_from_db()
+        with default_storage.open(post.image.name) as original:
+            image = Image.open(original)
+            self.assertEqual(image.size, (600, 1200))
+            self.assertEqual(dict(image.getexif()), {})
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100 * 100)
+    def test_too_large_image_is_skipped(self):
+        """Воркер не декодирует картинки больше лимита пикселей."""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=make_image("big.jpg")
+        )
+        generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_names, {})
+
+    def test_missing_image_is_skipped(self):
+        """Пост с пропавшим файлом картинки обрабатывается без ошибок."""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image="posts/missing.jpg"
+        )
+        generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_names, {})
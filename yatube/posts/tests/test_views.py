@@ -6,9 +6,16 @@ from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import (
+    Client, RequestFactory, TestCase, TransactionTestCase, override_settings,
+)
 from django.urls import reverse
-from posts.models import Follow, Group, Post, User
+from core.routers import replica_reads
+from posts import invalidation, paginators
+from posts.cards import card_key
+from posts.models import Comment, Follow, Group, Post, User
+
+from .utils import QueryBudgetMixin, commit_callbacks
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -48,6 +55,7 @@ class PostTemplatesTests(TestCase):
                 self.assertTemplateUsed(response, template)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_EXECUTOR="sync")
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -193,6 +201,53 @@ class PaginatorTestCase(TestCase):
         self.assertEqual(len(response.context["page_obj"]), 3)
 
 
+@override_settings(FEED_PAGINATION={"index": "cursor"})
+class CursorPaginatorTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            "Bogdan", "bboybaga13@mail.ru", "12345678"
+        )
+        Post.objects.bulk_create(
+            (Post(text=f"Текст {i}", author=cls.user) for i in range(13)),
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_cursor_pages(self):
+        """Курсорный паджинатор листает вперёд и назад."""
+        first = self.guest_client.get(reverse("posts:index"))
+        first_page = first.context["page_obj"]
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        self.assertContains(first, f"?after={first_page.next_cursor}")
+
+        second = self.guest_client.get(
+            reverse("posts:index") + f"?after={first_page.next_cursor}"
+        )
+        second_page = second.context["page_obj"]
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertNotContains(second, "?page=")
+
+        back = self.guest_client.get(
+            reverse("posts:index") + f"?before={second_page.previous_cursor}"
+        )
+        self.assertEqual(
+            list(back.context["page_obj"]), list(first_page)
+        )
+
+    def test_broken_cursor_opens_first_page(self):
+        """Битый курсор открывает первую страницу."""
+        response = self.guest_client.get(
+            reverse("posts:index") + "?after=broken"
+        )
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+
 class PostIsTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -266,27 +321,257 @@ class CacheTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(CacheTests.user)
 
-    def test_cache_post(self):
+    def test_cards_are_cached(self):
+        """Карточки постов берутся из кэша и не устаревают после правки."""
+        post = Post.objects.create(
+            text="Пост1;)",
+            author=CacheTests.user,
+        )
+        self.authorized_client.get(reverse("posts:index"))
+        self.assertIsNotNone(cache.get(card_key(post)))
+
+        post.text = "Пост2;)"
+        post.save()
+        response = self.authorized_client.get(reverse("posts:index"))
+        self.assertContains(response, "Пост2;)")
+        self.assertNotContains(response, "Пост1;)")
+
+    def test_deleted_post_leaves_index(self):
+        """Удалённый пост сразу пропадает с главной."""
         post = Post.objects.create(
             text="Пост1;)",
             author=CacheTests.user,
         )
-        content_add = self.authorized_client.get(
-            reverse("posts:index")
-        ).content
+        self.authorized_client.get(reverse("posts:index"))
         post.delete()
-        content_delete = self.authorized_client.get(
-            reverse("posts:index")
-        ).content
-        self.assertEqual(content_add, content_delete)
+        response = self.authorized_client.get(reverse("posts:index"))
+        self.assertNotContains(response, "Пост1;)")
+
+    def test_new_post_invalidates_index(self):
+        """Новый пост виден на главной без очистки кэша."""
+        self.authorized_client.get(reverse("posts:index"))
+        with commit_callbacks():
+            Post.objects.create(text="Свежий пост", author=CacheTests.user)
+        response = self.authorized_client.get(reverse("posts:index"))
+        self.assertContains(response, "Свежий пост")
+
+    def test_warm_page_reads_posts_by_pk(self):
+        """Повторный показ страницы обходится без COUNT(*) и сортировки.
+
+        Кроме выборки постов по pk остаётся только MAX(pub_date)
+        для Last-Modified.
+        """
+        Post.objects.create(text="Пост1;)", author=CacheTests.user)
+        guest_client = Client()
+        guest_client.get(reverse("posts:index"))
+        with self.assertNumQueries(2):
+            response = guest_client.get(reverse("posts:index"))
+        self.assertContains(response, "Пост1;)")
+
+    def test_group_move_invalidates_group_pages(self):
+        """Перенос поста в другую группу обновляет страницы обеих групп."""
+        old = Group.objects.create(title="Old", slug="old", description="-")
+        new = Group.objects.create(title="New", slug="new", description="-")
+        post = Post.objects.create(
+            text="Пост1;)", author=CacheTests.user, group=old
+        )
+        old_url = reverse("posts:group_posts", kwargs={"slug": "old"})
+        new_url = reverse("posts:group_posts", kwargs={"slug": "new"})
+        self.authorized_client.get(old_url)
+        self.authorized_client.get(new_url)
+        post.group = new
+        with commit_callbacks():
+            post.save()
+        self.assertNotContains(self.authorized_client.get(old_url), "Пост1;)")
+        self.assertContains(self.authorized_client.get(new_url), "Пост1;)")
+
+    def test_pages_are_not_shared(self):
+        """Вторая страница не отдаёт содержимое первой."""
+        Post.objects.bulk_create(
+            Post(text=f"Пост №{i}", author=CacheTests.user)
+            for i in range(11)
+        )
+        first = self.authorized_client.get(reverse("posts:index"))
+        second = self.authorized_client.get(
+            reverse("posts:index") + "?page=2"
+        )
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, "Пост №0")
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaCacheTests(TransactionTestCase):
+    def test_cached_page_is_read_from_primary(self):
+        """Страница, которая попадёт в кэш, читается с основной базы."""
+        user = User.objects.create_user("Bogdan")
+        post = Post.objects.create(text="Пост1;)", author=user)
+        request = RequestFactory().get("/")
+        object_list = Post.objects.order_by("-pub_date", "-pk")
+        generations = invalidation.index_generations()
+        for mode in ("offset", "cursor"):
+            with self.subTest(mode=mode), self.settings(
+                FEED_PAGINATION={"index": mode}
+            ), replica_reads(True):
+                cache.clear()
+                # Реплики replica1 нет: чтение с неё упало бы.
+                page = paginators.get_page(
+                    request, object_list, "index", generations
+                )
+                self.assertEqual(list(page), [post])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Bogdan")
+        cls.post = Post.objects.create(text="Пост", author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTests.user)
+
+    def test_not_modified(self):
+        """Страница с тем же ETag отдаётся как 304 одним запросом."""
+        url = reverse("posts:index")
+        etag = self.guest_client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        """Без ETag работает и If-Modified-Since."""
+        url = reverse("posts:profile", kwargs={"username": "Bogdan"})
+        last_modified = self.guest_client.get(url)["Last-Modified"]
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_cache_control(self):
+        """Анонимную страницу может кэшировать CDN, личную — нет."""
+        url = reverse("posts:index")
+        response = self.guest_client.get(url)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("s-maxage=", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+        response = self.authorized_client.get(url)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_etag_depends_on_user(self):
+        """Залогиненный пользователь не получит 304 на анонимный ETag."""
+        url = reverse("posts:index")
+        etag = self.guest_client.get(url)["ETag"]
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_comment_modifies_post_page(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = reverse(
+            "posts:post_detail",
+            kwargs={"post_id": ConditionalGetTests.post.pk},
+        )
+        etag = self.guest_client.get(url)["ETag"]
+        Comment.objects.create(
+            post=ConditionalGetTests.post,
+            author=ConditionalGetTests.user,
+            text="Комментарий",
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Комментарий")
+
+    def test_edit_keeps_unrelated_pages(self):
+        """Правка и комментарий не сбрасывают страницы, где поста нет."""
+        group = Group.objects.create(
+            title="Горы", slug="mountains", description="-"
+        )
+        other = User.objects.create_user("Ivan")
+        Post.objects.create(text="Чужой", author=other, group=group)
+        post = ConditionalGetTests.post
+        post_url = reverse("posts:post_detail", kwargs={"post_id": post.pk})
+        unrelated = [
+            reverse("posts:group_posts", kwargs={"slug": "mountains"}),
+            reverse("posts:profile", kwargs={"username": "Ivan"}),
+        ]
+        etags = {
+            url: self.guest_client.get(url)["ETag"]
+            for url in [post_url, *unrelated]
+        }
+        with commit_callbacks():
+            post.text = "Правка"
+            post.save()
+            Comment.objects.create(post=post, author=other, text="Ещё")
+        for url in unrelated:
+            response = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=etags[url]
+            )
+            self.assertEqual(response.status_code, 304)
+        response = self.guest_client.get(
+            post_url, HTTP_IF_NONE_MATCH=etags[post_url]
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Bogdan")
+        cls.post = Post.objects.create(text="Пост", author=cls.user)
+        for number in range(7):
+            commenter = User.objects.create_user(f"commenter{number}")
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f"Коммент №{number}"
+            )
+
+    def setUp(self):
         cache.clear()
-        content_delete = self.authorized_client.get(
-            reverse("posts:index")
-        ).content
-        self.assertNotEqual(content_add, content_delete)
+
+    def test_post_detail_renders_first_page(self):
+        """На странице поста только первые комментарии, новые сверху."""
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        )
+        comments = response.context["comments"]
+        self.assertEqual(
+            [comment.text for comment in comments],
+            ["Коммент №6", "Коммент №5", "Коммент №4"],
+        )
+        self.assertContains(response, "Показать ещё")
+        self.assertNotContains(response, "Коммент №3")
+
+    def test_load_more_fragment(self):
+        """«Показать ещё» отдаёт только фрагмент со следующей страницей."""
+        url = reverse("posts:post_comments", kwargs={"post_id": self.post.pk})
+        first = self.client.get(url)
+        self.assertNotContains(first, "<html")
+        after = first.context["comments"].next_cursor
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {"after": after})
+        self.assertEqual(
+            [comment.text for comment in response.context["comments"]],
+            ["Коммент №3", "Коммент №2", "Коммент №1"],
+        )
+        after = response.context["comments"].next_cursor
+        response = self.client.get(url, {"after": after})
+        self.assertEqual(
+            [comment.text for comment in response.context["comments"]],
+            ["Коммент №0"],
+        )
+        self.assertNotContains(response, "Показать ещё")
+
+    def test_unknown_post(self):
+        response = self.client.get(
+            reverse("posts:post_comments", kwargs={"post_id": 0})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
 
 
 class FollowTests(TestCase):
@@ -396,6 +681,22 @@ class FollowTests(TestCase):
         len_page = len(response.context["page_obj"])
         self.assertEqual(len_page, 0)
 
+    def test_follow_page_follows_subscriptions(self):
+        """Лента подписок обновляется сразу после новых постов и отписки."""
+        url = reverse("posts:follow_index")
+        self.first_authorized_client.get(url)
+        with commit_callbacks():
+            Post.objects.create(text="Post2", author=self.second_user)
+        self.assertContains(self.first_authorized_client.get(url), "Post2")
+        with commit_callbacks():
+            self.first_authorized_client.get(
+                reverse(
+                    "posts:profile_unfollow",
+                    kwargs={"username": self.second_user}
+                )
+            )
+        self.assertNotContains(self.first_authorized_client.get(url), "Post2")
+
     def test_only_one_follow(self):
         """Проверка, что подписываться можно только один раз."""
         response = self.first_authorized_client.get(
@@ -415,3 +716,88 @@ class FollowTests(TestCase):
             response.status_code,
             HTTPStatus.FOUND
         )
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(
+            "Pasha", "pasha2009@mail.ru", "123456789"
+        )
+        cls.author = User.objects.create_user(
+            "Bogdan", "bboybaga13@mail.ru", "12345678"
+        )
+        cls.group = Group.objects.create(
+            title="Test_title",
+            slug="group1",
+            description="ahahahahhaa, this is test...",
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.create(text="Текст", author=cls.author, group=cls.group)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetTests.reader)
+
+    def add_posts(self):
+        for _ in range(9):
+            Post.objects.create(
+                text="Текст", author=self.author, group=self.group
+            )
+
+    def test_feed_query_budgets(self):
+        """Число запросов лент не зависит от числа постов на странице."""
+        budgets = (
+            (self.guest_client, reverse("posts:index"), 3),
+            (
+                self.guest_client,
+                reverse("posts:group_posts", kwargs={"slug": "group1"}),
+                4,
+            ),
+            (
+                self.guest_client,
+                reverse("posts:profile", kwargs={"username": "Bogdan"}),
+                4,
+            ),
+            (self.authorized_client, reverse("posts:follow_index"), 6),
+        )
+        for client, url, budget in budgets:
+            with self.subTest(url=url):
+                self.assertQueryBudget(client, url, budget)
+        self.add_posts()
+        for client, url, budget in budgets:
+            with self.subTest(url=url):
+                self.assertQueryBudget(client, url, budget)
+
+    def test_post_detail_query_budget(self):
+        """Пост с автором, группой, счётчиком и комментариями — 3 запроса.
+
+        MAX(pub_date) для Last-Modified, пост со связями и страница
+        комментариев вместе с их авторами.
+        """
+        post = Post.objects.get()
+        for number in range(5):
+            Comment.objects.create(
+                post=post,
+                author=User.objects.create_user(f"commenter{number}"),
+                text="Комментарий",
+            )
+        url = reverse("posts:post_detail", kwargs={"post_id": post.pk})
+        response = self.assertQueryBudget(self.guest_client, url, 3)
+        self.assertContains(response, "Комментарий", count=5)
+
+    def test_post_edit_query_budget(self):
+        """Правка поста не ищет автора вторым запросом."""
+        author_client = Client()
+        author_client.force_login(QueryBudgetTests.author)
+        post = Post.objects.get()
+        url = reverse("posts:post_edit", kwargs={"post_id": post.pk})
+        # Сессия, пользователь, пост и группы для выпадающего списка.
+        self.assertQueryBudget(author_client, url, 4)
+        response = self.assertQueryBudget(self.authorized_client, url, 3)
+        self.assertRedirects(
+            response,
+            reverse("posts:post_detail", kwargs={"post_id": post.pk}),
+        )
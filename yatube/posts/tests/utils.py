@@ -0,0 +1,24 @@
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """Выполняет ``on_commit`` блока: TestCase транзакцию не коммитит."""
+    callbacks = connections[using].run_on_commit
+    start = len(callbacks)
+    yield
+    for entry in callbacks[start:]:
+        entry[1]()
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в фиксированное число запросов."""
+
+    def assertQueryBudget(self, client, url, budget):
+        cache.clear()
+        with self.assertNumQueries(budget):
+            response = client.get(url)
+        return response
@@ -0,0 +1,258 @@
+"""Миниатюры картинок постов, которые готовятся вне запроса.
+
+После сохранения поста с новой картинкой задача уходит в пул потоков
+(локальная замена очереди задач). Формы ещё до сохранения вырезают
+из JPEG EXIF и XMP (координаты съёмки, модель телефона), не декодируя
+пиксели; остальные картинки воркер перекодирует без метаданных, а до
+тех пор оригинал не показывается. Картинка декодируется один раз
+и режется под каждую ширину из ``POST_IMAGE_WIDTHS``
+и сохраняется в JPEG и в форматах из ``POST_IMAGE_FORMATS``, которые
+умеет текущий Pillow.
+Пути вариантов записываются в ``Post.thumbnails``: шаблоны только
+читают готовые адреса и не открывают картинки.
+"""
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from . import feed, invalidation
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment")
+STRIPPED_FORMATS = ("JPEG", "PNG", "WEBP")
+# APP1 (EXIF, XMP), APP13 (IPTC) и комментарий.
+JPEG_METADATA_MARKERS = (0xE1, 0xED, 0xFE)
+EXIF_ORIENTATION = 0x0112
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def image_formats():
+    """JPEG и те форматы из настроек, которые может записать Pillow."""
+    Image.init()
+    return ["jpeg"] + [
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format.upper() in Image.SAVE
+    ]
+
+
+def _sizes(original_width):
+    """Ширины не больше исходной, но хотя бы одна — самая узкая."""
+    ratio_width, ratio_height = settings.POST_IMAGE_RATIO
+    widths = sorted(settings.POST_IMAGE_WIDTHS)
+    widths = [
+        width for width in widths if width <= original_width
+    ] or widths[:1]
+    return [
+        (width, round(width * ratio_height / ratio_width))
+        for width in widths
+    ]
+
+
+def _encode(image, image_format, **options):
+    buffer = BytesIO()
+    options.setdefault(
+        "quality", settings.POST_IMAGE_QUALITY.get(image_format, 80)
+    )
+    image.save(buffer, image_format.upper(), **options)
+    return buffer.getvalue()
+
+
+def _store(name, content):
+    # Имена постоянные, поэтому повторная генерация перезаписывает файлы.
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content))
+
+
+def _save(name, image, image_format, **options):
+    return _store(name, _encode(image, image_format, **options))
+
+
+def _without_metadata(original, image_format):
+    """Оригинал, перекодированный без метаданных, или ``None``.
+
+    Файлы без метаданных не трогаем, чтобы повторные задачи не копили
+    потери JPEG. Анимацию не перекодируем: сохранился бы один кадр.
+    """
+    if image_format not in STRIPPED_FORMATS or not any(
+        key in original.info for key in METADATA_KEYS
+    ):
+        return None
+    for key in METADATA_KEYS:
+        original.info.pop(key, None)
+    return _encode(
+        original,
+        image_format.lower(),
+        icc_profile=original.info.get("icc_profile"),
+    )
+
+
+def _prepare(original):
+    """Картинка с учётом поворота из EXIF и её формат для перекодирования.
+
+    Формат ``None`` у анимации: её нельзя перекодировать без потерь.
+    """
+    image_format = original.format
+    if getattr(original, "is_animated", False):
+        image_format = None
+    return ImageOps.exif_transpose(original), image_format
+
+
+def _jpeg_without_metadata(data, orientation):
+    """JPEG без сегментов APP1, APP13 и COM; пиксели не декодируются.
+
+    От EXIF остаётся только поворот, чтобы воркер развернул картинку.
+    ``None`` — разобрать файл не вышло.
+    """
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    kept = [b"\xff\xd8"]
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            position += 1
+            continue
+        if marker == 0xDA:
+            # Дальше сжатые данные: метаданных после них нет.
+            kept.append(data[position:])
+            return b"".join(kept)
+        length = int.from_bytes(data[position + 2:position + 4], "big")
+        segment = data[position:position + 2 + length]
+        position += 2 + length
+        if marker not in JPEG_METADATA_MARKERS:
+            kept.append(segment)
+        elif segment[4:10] == b"Exif\x00\x00" and orientation not in (
+            None, 1
+        ):
+            exif = Image.Exif()
+            exif[EXIF_ORIENTATION] = orientation
+            payload = exif.tobytes()
+            kept.append(
+                b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload
+            )
+    return None
+
+
+def strip_upload(upload):
+    """Загруженная картинка без EXIF и XMP; пиксели не декодируются.
+
+    Метаданные ищутся по заголовку. JPEG чистится прямо в байтах,
+    остальные форматы дочищает воркер, а до тех пор ``thumbnail_url``
+    оригинал не показывает.
+    """
+    if not isinstance(upload, UploadedFile):
+        return upload
+    upload.seek(0)
+    header = Image.open(upload)
+    exif = header.getexif()
+    if header.format != "JPEG" or not (
+        exif or any(key in header.info for key in METADATA_KEYS)
+        or any(name == "APP13" for name, _ in header.applist)
+    ):
+        upload.seek(0)
+        return upload
+    upload.seek(0)
+    content = _jpeg_without_metadata(
+        upload.read(), exif.get(EXIF_ORIENTATION)
+    )
+    upload.seek(0)
+    if content is None:
+        return upload
+    return SimpleUploadedFile(upload.name, content, upload.content_type)
+
+
+def build(post):
+    """Готовит картинку поста.
+
+    Возвращает имя очищенного оригинала и варианты
+    ``{формат: {"ШxВ": имя файла}}``.
+    """
+    image = post.image
+    if not image or not image.storage.exists(image.name):
+        return image.name, {}
+    with image.storage.open(image.name) as source:
+        original = Image.open(source)
+        width, height = original.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            logger.warning(
+                "Картинка поста %s слишком большая: %sx%s",
+                post.pk, width, height,
+            )
+            return image.name, {}
+        original, image_format = _prepare(original)
+    # Формы убирают метаданные сами, здесь остаются загрузки в обход них.
+    content = _without_metadata(original, image_format)
+    name = image.name if content is None else _store(image.name, content)
+    original = original.convert("RGB")
+    prefix = hashlib.md5(name.encode()).hexdigest()[:12]
+    formats = image_formats()
+    variants = {image_format: {} for image_format in formats}
+    for width, height in _sizes(original.width):
+        resized = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        geometry = f"{width}x{height}"
+        for image_format in formats:
+            variant = f"posts/variants/{prefix}-{geometry}.{image_format}"
+            variants[image_format][geometry] = _save(
+                variant, resized, image_format
+            )
+    return name, variants
+
+
+def generate(post_id):
+    """Задача воркера: строит миниатюры и сохраняет их пути в посте."""
+    try:
+        post = Post.objects.filter(pk=post_id).only(
+            "id", "image", "author_id", "group_id"
+        ).first()
+        if post is None:
+            return
+        image_name = post.image.name
+        name, thumbnails = build(post)
+        # Картинку могли заменить, пока шла обработка: тогда результат
+        # уже не нужен, его перезапишет следующая задача.
+        updated = Post.objects.filter(pk=post_id, image=image_name).update(
+            image=name, thumbnails=json.dumps(thumbnails)
+        )
+        if updated:
+            invalidation.bump_post(
+                post, post.author_id in feed.pull_author_ids()
+            )
+    except Exception:
+        logger.exception("Не удалось подготовить миниатюры поста %s", post_id)
+    finally:
+        if settings.THUMBNAIL_EXECUTOR != "sync":
+            close_old_connections()
+
+
+def schedule(post_id):
+    if settings.THUMBNAIL_EXECUTOR == "sync":
+        transaction.on_commit(lambda: generate(post_id))
+    else:
+        transaction.on_commit(
+            lambda: _get_executor().submit(generate, post_id)
+        )
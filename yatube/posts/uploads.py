@@ -0,0 +1,39 @@
+"""Приём загрузок без буферизации в памяти процесса."""
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+
+class BoundedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл, но не дальше POST_IMAGE_MAX_BYTES.
+
+    Остаток потока читается и отбрасывается, а ``size`` файла остаётся
+    настоящим: форма видит превышение и показывает ошибку вместо того,
+    чтобы молча потерять поле.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        limit = settings.POST_IMAGE_MAX_BYTES
+        if start < limit:
+            self.file.write(raw_data[:limit - start])
+
+
+def bounded_uploads(view):
+    """Принимает файлы представления через BoundedTemporaryFileUploadHandler.
+
+    Остальной сайт, включая админку, работает с обработчиками Django.
+    Обработчики нельзя сменить после разбора тела, а CsrfViewMiddleware
+    читает ``request.POST`` раньше представления, поэтому проверка CSRF
+    переносится внутрь.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [BoundedTemporaryFileUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+
+    return wrapper
@@ -13,7 +13,13 @@ urlpatterns = [
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path("posts/<int:post_id>/comment", views.add_comment, name="add_comment"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
     path(
         "profile/<str:username>/follow/",
         views.profile_follow,
@@ -1,32 +1,47 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_http_methods
 
+from . import feed, invalidation
+from .cards import render_cards
+from .conditional import (conditional_page, follow_state, group_state,
+                          index_state, post_state, profile_state)
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .models import Follow, Group, Post, User
+from .paginators import CursorPaginator, get_page
+from .search import search_ids
+from .uploads import bounded_uploads
 
 
-@cache_page(20)
 @require_http_methods(["GET"])
+@conditional_page(index_state)
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related("author", "group")
+    page_obj = get_page(
+        request, posts, "index", invalidation.index_generations()
+    )
+    page_obj.object_list = render_cards(page_obj)
     return render(
         request, "posts/index.html", {"page_obj": page_obj, "posts": posts}
     )
 
 
 @require_http_methods(["GET"])
+@conditional_page(group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.select_related("author")
+    page_obj = get_page(
+        request,
+        posts,
+        "group_posts",
+        invalidation.group_generations(group.pk),
+    )
+    page_obj.object_list = render_cards(page_obj)
     return render(
         request,
         "posts/group_list.html",
@@ -35,9 +50,12 @@ def group_posts(request, slug):
 
 
 @require_http_methods(["GET"])
+@conditional_page(profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    posts = author.posts.select_related("group")
     if request.user.is_authenticated:
         authorization = True
         following = Follow.objects.filter(
@@ -51,9 +69,13 @@ def profile(request, username):
     else:
         following = False
         authorization = False
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    page = get_page(
+        request,
+        posts,
+        "profile",
+        invalidation.profile_generations(author.pk),
+    )
+    page.object_list = render_cards(page)
     context = {
         "author": author,
         "page_obj": page,
@@ -63,19 +85,29 @@ def profile(request, username):
     return render(request, "posts/profile.html", context)
 
 
+def _comment_page(request, post):
+    """Страница комментариев поста: не больше COMMENTS_PER_PAGE штук."""
+    comments = post.comments.select_related("author")
+    return CursorPaginator(comments, settings.COMMENTS_PER_PAGE).get_page(
+        after=request.GET.get("after")
+    )
+
+
 @require_http_methods(["GET", "POST"])
+@conditional_page(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    user = get_object_or_404(User, username=post.author)
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"), pk=post_id
+    )
     form = CommentForm(
         request.POST or None,
     )
-    comments = Comment.objects.filter(post=post)
+    comments = _comment_page(request, post)
     return render(
         request,
         "posts/post.html",
         {
-            "user": user,
+            "author": post.author,
             "post": post,
             "form": form,
             "comments": comments,
@@ -83,6 +115,19 @@ def post_detail(request, post_id):
     )
 
 
+@require_http_methods(["GET"])
+@conditional_page(post_state)
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев для «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    return render(
+        request,
+        "posts/includes/comments.html",
+        {"post": post, "comments": _comment_page(request, post)},
+    )
+
+
+@bounded_uploads
 @require_http_methods(["POST", "GET"])
 @login_required
 def new_post(request):
@@ -104,15 +149,16 @@ def new_post(request):
     )
 
 
+@bounded_uploads
 @require_http_methods(["GET", "POST"])
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id, author__username=request.user)
+    post = get_object_or_404(Post, pk=post_id)
+    if post.author_id != request.user.pk:
+        return redirect("posts:post_detail", post_id=post_id)
     form = PostForm(
         request.POST or None, files=request.FILES or None, instance=post
     )
-    if post.author != request.user:
-        return redirect("posts:post_detail", post_id=post_id)
     if form.is_valid():
         post.save()
         return redirect("posts:post_detail", post_id=post_id)
@@ -137,16 +183,42 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional_page(follow_state)
 def follow_index(request):
     user = request.user
-    posts = Post.objects.filter(author__following__user=user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = feed.get_feed(user).select_related("author", "group")
+    page_obj = get_page(
+        request,
+        posts,
+        "follow_index",
+        invalidation.follow_generations(user.pk),
+    )
+    page_obj.object_list = render_cards(page_obj)
     context = {"page_obj": page_obj, "posts": posts}
     return render(request, "posts/follow.html", context)
 
 
+@require_http_methods(["GET"])
+def search(request):
+    query = request.GET.get("q", "").strip()
+    ids = search_ids(query) if query else []
+    page_obj = Paginator(ids, settings.POSTS_PER_PAGE).get_page(
+        request.GET.get("page")
+    )
+    posts = Post.objects.select_related("author", "group").in_bulk(
+        page_obj.object_list
+    )
+    page_obj.object_list = render_cards(
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    )
+    context = {
+        "page_obj": page_obj,
+        "query": query,
+        "paginator_query": urlencode({"q": query}) + "&",
+    }
+    return render(request, "posts/search.html", context)
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -0,0 +1,39 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI handler of its own, so there the WSGI application
+runs behind ``asgiref``'s adapter in a thread pool: the ASGI server keeps
+slow clients on its event loop and a thread is only busy while the view
+runs. Django 3.0+ gets its native handler.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+
+if django.VERSION >= (3, 0):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+else:
+    from asgiref.wsgi import WsgiToAsgi
+    from django.core.wsgi import get_wsgi_application
+
+    def strip_header_values(wsgi_application):
+        # Django 2.2 пишет Set-Cookie как ``cookie.output(header="")`` —
+        # с пробелом в начале значения. gunicorn его срезает, а h11
+        # в uvicorn отвергает весь ответ.
+        def wrapper(environ, start_response):
+            def start(status, headers, exc_info=None):
+                headers = [(name, value.strip()) for name, value in headers]
+                return start_response(status, headers, exc_info)
+
+            return wsgi_application(environ, start)
+
+        return wrapper
+
+    application = WsgiToAsgi(strip_header_values(get_wsgi_application()))
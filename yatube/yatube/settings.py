@@ -1,5 +1,7 @@
 import os
 
+import django
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = "19rtn_=bo8a*(fth&_*o(x7hg_y3+&y&5oz3qntes54nxn3egq"
@@ -17,6 +19,7 @@ ALLOWED_HOSTS = [
 
 
 INSTALLED_APPS = [
+    "core",
     "about",
     "users",
     "posts",
@@ -28,14 +31,19 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "sorl.thumbnail",
     "debug_toolbar",
+    "rest_framework",
+    "api",
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -45,12 +53,20 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+DEBUG_TOOLBAR_CONFIG = {
+    "SHOW_TOOLBAR_CALLBACK": "core.middleware.show_toolbar",
+    # Колбэк сам проверяет DEBUG, который в тестах выключен: проверка
+    # debug_toolbar.E001 новых версий здесь ложная.
+    "IS_RUNNING_TESTS": False,
+}
+
 ROOT_URLCONF = "yatube.urls"
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Как стандартный, но засекает время отрисовки для метрик.
+        "BACKEND": "core.template_backends.DjangoTemplates",
         "DIRS": [TEMPLATES_DIR],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -68,12 +84,59 @@ TEMPLATES = [
 WSGI_APPLICATION = "yatube.wsgi.application"
 
 
+DB_ENGINES = {
+    "sqlite": "django.db.backends.sqlite3",
+    "postgresql": "django.db.backends.postgresql",
+}
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "ENGINE": DB_ENGINES[DB_ENGINE],
+        "NAME": os.getenv(
+            "DB_NAME",
+            os.path.join(BASE_DIR, "db.sqlite3")
+            if DB_ENGINE == "sqlite" else "yatube",
+        ),
+        "USER": os.getenv("DB_USER", ""),
+        "PASSWORD": os.getenv("DB_PASSWORD", ""),
+        "HOST": os.getenv("DB_HOST", ""),
+        "PORT": os.getenv("DB_PORT", ""),
+        # Соединение живёт между запросами воркера; на Django 4.1+
+        # перед повторным использованием проверяется, что оно не умерло.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
+# Выполняются на каждом новом соединении SQLite (core.db): в WAL читатели
+# не ждут писателя, второй писатель ждёт блокировку busy_timeout мс
+# вместо «database is locked», а synchronous=NORMAL в WAL не портит базу
+# при сбое, только может потерять последние транзакции.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
+    "synchronous": "NORMAL",
+}
+
+# DB_REPLICAS: через запятую файлы SQLite или хосты PostgreSQL реплик.
+# GET-запросы читают с них (core.routers), запись идёт в default.
+DB_REPLICAS = [name for name in os.getenv("DB_REPLICAS", "").split(",") if name]
+DATABASE_REPLICAS = []
+for number, replica in enumerate(DB_REPLICAS, 1):
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME" if DB_ENGINE == "sqlite" else "HOST": replica,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+# Сколько секунд после записи пользователь читает основную базу.
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = "primary_reads"
+
+# Явный тип ключей: на Django 3.2+ иначе предупреждение, а BigAutoField
+# потребовал бы миграций всех таблиц.
+DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -98,7 +161,9 @@ TIME_ZONE = "UTC"
 
 USE_I18N = True
 
-USE_L10N = True
+# С Django 4.0 локализация форматов включена всегда, настройка устарела.
+if django.VERSION < (4, 0):
+    USE_L10N = True
 
 USE_TZ = True
 
@@ -121,8 +186,134 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 CSRF_FAILURE_VIEW = "core.views.csrf_token"
 
+# Метрики запросов (core.metrics) на /metrics/ в формате Prometheus:
+# их видят персонал и запросы с заголовком "Authorization: Bearer <токен>".
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Границы гистограмм: секунды для времени, штуки для SQL-запросов.
+METRICS_DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+METRICS_QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+# Заголовок Server-Timing раскрывает клиентам время SQL и шаблонов,
+# поэтому включается только явно, для отладки.
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "0") == "1"
+
+# Запросы к базе дольше SLOW_QUERY_MS мс пишутся в журнал core.queries
+# с представлением и строкой кода; 0 — не писать.
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", 0))
+# Статистика по отпечаткам SQL (core.queries) для команды top_queries:
+# каждый процесс раз в QUERY_STATS_FLUSH_SECONDS пишет её в файл.
+QUERY_STATS = os.getenv("QUERY_STATS", "0") == "1"
+QUERY_STATS_LOCATION = os.getenv(
+    "QUERY_STATS_LOCATION", os.path.join(BASE_DIR, "query_stats.sqlite3")
+)
+QUERY_STATS_FLUSH_SECONDS = 10
+
+# Профили запросов (core.profiling): по заголовку X-Profile с токеном
+# из команды profile_token, по ?profile=1 у персонала и случайно у доли
+# PROFILING_SAMPLE_RATE запросов (0.001 — каждый тысячный).
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(BASE_DIR, "profiles"))
+# "cprofile" — точные вызовы, "sampling" — стеки раз в PROFILING_INTERVAL
+# секунд с малыми накладными расходами; выборка всегда "sampling".
+PROFILING_PROFILER = os.getenv("PROFILING_PROFILER", "cprofile")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+PROFILING_INTERVAL = 0.001
+# Сколько последних профилей хранить на адрес.
+PROFILING_KEEP = 20
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain"},
+    },
+    "loggers": {
+        "core.queries": {"handlers": ["console"], "level": "WARNING"},
+    },
+}
+
+# Кэш выбирается переменными окружения: в продакшене общий Redis или
+# Memcached, локально можно взять файл SQLite, общий для всех воркеров.
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "sqlite": "core.cache.SQLiteCache",
+    # Необязательные зависимости, команды установки — в README.
+    "redis": "django_redis.cache.RedisCache",
+    "memcached": "django.core.cache.backends.memcached.PyLibMCCache",
+}
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND],
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION", os.path.join(BASE_DIR, "cache.sqlite3")
+        ),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", 300)),
     }
 }
+if CACHE_BACKEND in ("locmem", "sqlite"):
+    CACHES["default"]["OPTIONS"] = {
+        "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+        "MAX_BYTES": int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    }
+
+# Лента подписок: авторов с числом подписчиков от FEED_FANOUT_LIMIT
+# не раскладываем по лентам, а читаем при запросе.
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_LIMIT = 500
+FEED_BATCH_SIZE = 1000
+FEED_PULL_AUTHORS_TIMEOUT = 60
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+# Пагинация лент: "offset" (?page=N) или "cursor" (?after=/?before=).
+FEED_PAGINATION = {
+    "index": "offset",
+    "group_posts": "offset",
+    "profile": "offset",
+    "follow_index": "offset",
+}
+
+# Карточки постов кэшируются по отпечатку содержимого; смена версии
+# сбрасывает их все (например, после правки post_card.html).
+POST_CARD_VERSION = 2
+POST_CARD_TIMEOUT = 60 * 60 * 24
+# Списки постов страниц лент сбрасываются сигналами, поэтому живут долго.
+FEED_PAGE_TIMEOUT = 60 * 60 * 6
+
+# Миниатюры картинок постов готовятся в фоне после сохранения.
+# THUMBNAIL_EXECUTOR: "thread" — пул потоков, "sync" — сразу после коммита.
+THUMBNAIL_EXECUTOR = os.getenv("THUMBNAIL_EXECUTOR", "thread")
+THUMBNAIL_WORKERS = 2
+# Варианты картинки поста: ширины при пропорциях POST_IMAGE_RATIO.
+POST_IMAGE_WIDTHS = (480, 720, 960)
+POST_IMAGE_RATIO = (960, 339)
+# Форматы в дополнение к JPEG; те, что не умеет Pillow, пропускаются.
+POST_IMAGE_FORMATS = ("avif", "webp")
+POST_IMAGE_QUALITY = {"jpeg": 85, "webp": 80, "avif": 60}
+# Атрибут sizes: карточка занимает всю ширину узкого экрана.
+POST_IMAGE_SIZES = "(max-width: 992px) 100vw, 960px"
+
+# Картинка поста всегда идёт во временный файл, а не в память воркера,
+# и пишется не дальше POST_IMAGE_MAX_BYTES (posts.uploads.bounded_uploads).
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+# Проверяется по заголовку файла, до декодирования картинки.
+POST_IMAGE_MAX_PIXELS = 25_000_000
+
+# Сколько лучших результатов поиска ранжируется и разбивается на страницы.
+POST_SEARCH_MAX_RESULTS = 1000
+
+# Мобильные клиенты читают только JSON: одно представление на адрес,
+# поэтому ETag не зависит от заголовка Accept.
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+    ],
+}
+
+# Сколько секунд CDN может отдавать анонимную страницу без перепроверки.
+PAGE_CACHE_S_MAXAGE = 60
@@ -5,6 +5,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import cache_stats, metrics_view
+
 handler404 = "core.views.page_not_found"  # noqa
 handler403 = "core.views.csrf_token"  # noqa
 handler500 = "core.views.server_error"  # noqa
@@ -15,6 +17,9 @@ urlpatterns = [
     path("auth/", include("users.urls", namespace="users")),
     path("auth/", include("django.contrib.auth.urls")),
     path("about/", include("about.urls", namespace="about")),
+    path("api/", include("api.urls", namespace="api")),
+    path("cache-stats/", cache_stats, name="cache_stats"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
 
 if settings.DEBUG: